@@ -0,0 +1,23 @@
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Shared pool for post-upload work (tile pyramids, image optimization, ...)
+executor = ThreadPoolExecutor(
+    max_workers=settings.background_workers,
+    thread_name_prefix="background"
+)
+
+def _log_failure(future: Future) -> None:
+    exc = future.exception()
+    if exc:
+        logger.error("Background job failed", exc_info=exc)
+
+def submit_job(fn: Callable, *args, **kwargs) -> Future:
+    """Run a job on the background pool without blocking the request."""
+    future = executor.submit(fn, *args, **kwargs)
+    future.add_done_callback(_log_failure)
+    return future
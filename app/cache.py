@@ -0,0 +1,216 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Optional
+import orjson
+from sqlalchemy import DateTime, Enum, event, inspect
+from sqlalchemy.orm import Session, object_session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from app.config import settings
+from app.models import Painting, User, Category
+
+try:
+    import redis
+except ImportError:  # Optional: only needed when REDIS_URL is set
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """Thread-safe in-process cache with a size bound and per-entry TTL."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class RedisCache:
+    """Shared cache across API processes; errors degrade to cache misses."""
+
+    def __init__(self, url: str, prefix: str = "verline:"):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get(self.prefix + key)
+        except redis.RedisError:
+            logger.warning("Redis cache unavailable", exc_info=True)
+            return None
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        try:
+            self.client.set(self.prefix + key, value, ex=ttl)
+        except redis.RedisError:
+            logger.warning("Redis cache unavailable", exc_info=True)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(self.prefix + key)
+        except redis.RedisError:
+            logger.warning("Redis cache unavailable", exc_info=True)
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(self.prefix + key)
+
+def _create_cache(max_entries: int):
+    if settings.redis_url and redis is not None:
+        return RedisCache(settings.redis_url)
+    if settings.redis_url:
+        logger.warning("REDIS_URL is set but the redis package is not installed; using the in-process cache")
+    return LRUCache(max_entries)
+
+response_cache = _create_cache(settings.response_cache_max_entries)
+entity_cache = _create_cache(settings.entity_cache_max_entries)
+
+# Catalog version: part of every listing cache key, so bumping it invalidates
+# all cached listings at once. With Redis it is shared by all processes; the
+# in-process counter only covers this process, and other processes converge
+# within RESPONSE_CACHE_TTL.
+_local_catalog_version = 0
+
+def catalog_version() -> int:
+    if isinstance(response_cache, RedisCache):
+        value = response_cache.get("catalog_version")
+        return int(value) if value else 0
+    return _local_catalog_version
+
+def bump_catalog_version() -> None:
+    """Invalidate cached listings after the catalog changed."""
+    global _local_catalog_version
+    _local_catalog_version += 1
+    if isinstance(response_cache, RedisCache):
+        try:
+            response_cache.incr("catalog_version")
+        except redis.RedisError:
+            logger.warning("Could not bump the catalog version", exc_info=True)
+
+def listing_cache_key(name: str, params: dict) -> str:
+    """Cache key for a listing: catalog version plus the normalized query parameters."""
+    normalized = "&".join(
+        f"{key}={getattr(value, 'value', value)}"
+        for key, value in sorted(params.items()) if value is not None
+    )
+    return f"{name}:v{catalog_version()}:{normalized}"
+
+ENTITY_TTLS = {
+    Painting: lambda: settings.entity_cache_ttl_painting,
+    User: lambda: settings.entity_cache_ttl_user,
+    Category: lambda: settings.entity_cache_ttl_category,
+}
+
+def _entity_key(model: type, entity_id: int) -> str:
+    return f"entity:{model.__name__}:{entity_id}"
+
+# Columns never written to the shared cache; they load from the database if accessed
+UNCACHED_COLUMNS = {"hashed_password"}
+
+def _dump_entity(instance) -> dict:
+    """Loaded column values as plain data; related entities are cached on their own."""
+    state = inspect(instance)
+    return {
+        prop.key: getattr(instance, prop.key)
+        for prop in state.mapper.column_attrs
+        if prop.key not in UNCACHED_COLUMNS and prop.key not in state.unloaded
+    }
+
+def _load_entity(model: type, data: dict):
+    """
+    Rebuild a detached instance from _dump_entity() output. Values are set as
+    already committed, so merging it with load=False emits no query.
+    """
+    mapper = inspect(model)
+    instance = mapper.class_manager.new_instance()
+    for key, value in data.items():
+        if value is not None:
+            column_type = mapper.column_attrs[key].columns[0].type
+            if isinstance(column_type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column_type, Enum) and column_type.enum_class is not None:
+                value = column_type.enum_class(value)
+        set_committed_value(instance, key, value)
+    make_transient_to_detached(instance)
+    return instance
+
+def get_cached_entity(
+    db: Session,
+    model: type,
+    entity_id: int,
+    loader: Callable,
+    relations: Optional[Dict[str, Callable[[int], object]]] = None
+):
+    """
+    Read-through lookup of an entity by id. Entries are JSON column values
+    (never pickles, so cache contents cannot run code in the API); hits are
+    rebuilt and merged into the session without a query. Misses call loader()
+    and cache its result.
+
+    Only the entity's own columns are cached. On a hit, each many-to-one
+    relation in `relations` (name -> getter by id, e.g. UserService.get_user)
+    is resolved through that getter, so a related entity is cached, and
+    invalidated, in one place instead of inside every entity that embeds it.
+    """
+    key = _entity_key(model, entity_id)
+    data = entity_cache.get(key)
+    if data is not None:
+        instance = db.merge(_load_entity(model, orjson.loads(data)), load=False)
+        mapper = inspect(model)
+        for name, getter in (relations or {}).items():
+            foreign_key = next(iter(mapper.relationships[name].local_columns)).key
+            related_id = getattr(instance, foreign_key)
+            set_committed_value(instance, name, getter(related_id) if related_id is not None else None)
+        return instance
+
+    instance = loader()
+    if instance is not None:
+        entity_cache.set(key, orjson.dumps(_dump_entity(instance)), ENTITY_TTLS[model]())
+    return instance
+
+def invalidate_entity(model: type, entity_id: int) -> None:
+    """Drop a cached entity; needed after bulk query.update(), which emits no ORM events."""
+    entity_cache.delete(_entity_key(model, entity_id))
+
+def _on_entity_change(mapper, connection, target) -> None:
+    invalidate_entity(mapper.class_, target.id)
+    # Drop it again after commit, so a concurrent reader can't re-cache the old row
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("invalidated_entities", set()).add((mapper.class_, target.id))
+
+for _model in ENTITY_TTLS:
+    event.listen(_model, "after_update", _on_entity_change)
+    event.listen(_model, "after_delete", _on_entity_change)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for model, entity_id in session.info.pop("invalidated_entities", ()):
+        invalidate_entity(model, entity_id)
@@ -0,0 +1,147 @@
+import gzip
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+# Bodies of these types are already compressed (or must stream unbuffered)
+SKIP_CONTENT_TYPES = (
+    "image/", "video/", "audio/", "application/zip", "application/gzip",
+    "application/octet-stream", "text/event-stream", "multipart/byteranges",
+)
+
+# Cached bodies are compressed once and served many times, so they get more effort
+PRECOMPRESSED_LEVELS = {"br": 9, "gzip": 9}
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick br or gzip from an Accept-Encoding header: the one with the highest
+    q-value ("*" covers unlisted codings), br on a tie; None for identity.
+    """
+    offered = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        quality = offered.get(coding, offered.get("*", 0))
+        if quality > best_quality:  # Strictly higher, so br wins ties
+            best, best_quality = coding, quality
+    return best
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Compress a complete body; `level` overrides the per-request defaults."""
+    if encoding == "br":
+        return brotli.compress(body, quality=level if level is not None else settings.compression_brotli_quality)
+    return gzip.compress(body, compresslevel=level if level is not None else settings.compression_gzip_level, mtime=0)
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.compression_brotli_quality)
+            self._finish = self._compressor.finish
+            self._compress = self._compressor.process
+        else:
+            self._compressor = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._finish = self._compressor.flush
+            self._compress = self._compressor.compress
+
+    def process(self, chunk: bytes, more_body: bool) -> bytes:
+        data = self._compress(chunk)
+        return data + self._finish() if not more_body else data
+
+class CompressionMiddleware:
+    """
+    gzip / Brotli response compression. Small bodies, already compressed media
+    (anything under /uploads and image/video/archive types) and responses that
+    already carry a Content-Encoding (e.g. pre-compressed cache entries) pass
+    through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, skip_paths: tuple = ("/uploads",)):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_paths):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or "content-range" in headers
+                    or headers.get("content-type", "").startswith(SKIP_CONTENT_TYPES)
+                    or message["status"] in (204, 304)
+                )
+                return
+
+            if message["type"] != "http.response.body":
+                # e.g. zero-copy / pathsend extensions: never compressed
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                await send(message)
+                return
+
+            if start_message is not None:
+                # First body message decides how the response is sent
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                headers = MutableHeaders(raw=start_message["headers"])
+                if passthrough or (not more_body and len(body) < self.minimum_size):
+                    if not passthrough:
+                        headers.add_vary_header("Accept-Encoding")
+                    passthrough = True
+                else:
+                    compressor = _StreamCompressor(encoding)
+                    message["body"] = compressor.process(body, more_body)
+                    headers.add_vary_header("Accept-Encoding")
+                    headers["content-encoding"] = encoding
+                    if more_body:
+                        del headers["content-length"]
+                    else:
+                        headers["content-length"] = str(len(message["body"]))
+                    if "etag" in headers and not headers["etag"].startswith("W/"):
+                        # A compressed body is no longer byte-identical
+                        headers["etag"] = f"W/{headers['etag']}"
+                await send(start_message)
+                start_message = None
+                await send(message)
+                return
+
+            if compressor is not None and not passthrough:
+                message["body"] = compressor.process(message.get("body", b""), message.get("more_body", False))
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -19,10 +19,65 @@ class Settings(BaseSettings):
     # Redis
     redis_url: Optional[str] = None
     
+    # Response cache for anonymous listings (shared through Redis when redis_url is set)
+    response_cache_ttl: int = 30  # Seconds a cached listing may be served stale
+    response_cache_max_entries: int = 1000  # In-process LRU bound
+    
+    # Response compression (Brotli needs the optional brotli package)
+    compression_min_size: int = 1024  # Smaller bodies are sent uncompressed
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    
+    # Read-through entity cache (paintings, users, categories by id)
+    entity_cache_max_entries: int = 5000
+    entity_cache_ttl_painting: int = 60
+    entity_cache_ttl_user: int = 300
+    entity_cache_ttl_category: int = 3600
+    
+    # Weighted (Bayesian) rating score used by the best_rated sort
+    bayesian_prior_weight: int = 10  # How many ratings' worth of the global mean each score starts from
+    bayesian_prior_mean: float = 3.0  # Used until refresh_rating_scores.py has stored the real mean
+    
+    # Batch multi-get (GET /paintings/batch, GET /users/batch)
+    batch_get_max_ids: int = 100
+    
     # File Upload
     max_file_size: int = 10485760  # 10MB
     allowed_image_extensions: str = "jpg,jpeg,png,webp"
+    max_image_pixels: int = 100000000  # Decompression bomb guard, checked from the header
     upload_dir: str = "./uploads"
+    upload_sharding: bool = True  # Store new uploads as ab/cd/<uuid>.ext
+    resumable_upload_dir: str = "./uploads_staging"  # Not served; holds partial uploads
+    resumable_upload_expiry_hours: int = 24
+    batch_upload_max_items: int = 50
+    batch_upload_concurrency: int = 4  # Images processed in parallel per batch request
+    
+    # Derivatives (thumbnails)
+    thumbnail_size: int = 300
+    thumbnail_format: str = "JPEG"  # JPEG, WEBP or PNG
+    thumbnail_quality: int = 85
+    derivative_workers: int = 0  # Rebuild CLI process cap, 0 = half the CPU cores
+    
+    # Deep zoom tiles
+    tile_min_pixels: int = 16000000  # Originals at least this large get a tile pyramid
+    tile_size: int = 256
+    tile_quality: int = 85
+    
+    # Thumbnail sprite sheets (one per block of consecutive painting ids)
+    sprite_block_size: int = 50
+    sprite_columns: int = 10
+    
+    # Lossless post-upload optimization (progressive/optimized JPEG, recompressed PNG)
+    optimize_images: bool = False
+    jpegtran_path: str = "jpegtran"  # Originals are only rewritten losslessly; JPEGs need jpegtran
+    
+    # Background jobs
+    background_workers: int = 2
+    
+    # Media delivery
+    media_delivery_mode: str = "static"  # static, sendfile, x-accel-redirect, x-sendfile
+    media_accel_redirect_prefix: str = "/protected-uploads"
+    media_cache_max_age: int = 86400  # 1 day
     
     class Config:
         env_file = ".env"
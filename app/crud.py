@@ -1,14 +1,19 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc, func
-from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, or_, desc, asc, func, case
+from typing import Dict, List, Optional, Tuple
 from fastapi import HTTPException, status
-from app.models import User, Painting, Category, Rating, Comment
+from app.models import User, Painting, Category, Rating, Comment, PaintingStatus, UserRole, RatingPrior
 from app.schemas import (
     UserCreate, UserUpdate, PaintingCreate, PaintingUpdate, 
     CategoryCreate, RatingCreate, CommentCreate, CommentUpdate,
     PaintingFilters, SortOptions
 )
 from app.auth import get_password_hash
+from app.cache import bump_catalog_version, get_cached_entity, invalidate_entity
+from app.config import settings
+
+# Compare-and-set retries for a re-rate racing another update of the same rating
+RATING_WRITE_ATTEMPTS = 3
 
 # User CRUD operations
 class UserService:
@@ -36,11 +41,21 @@ class UserService:
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        if user.role == "artist":
+            bump_catalog_version()  # New entry in the cached artist directory
         return db_user
     
     @staticmethod
     def get_user(db: Session, user_id: int) -> Optional[User]:
-        return db.query(User).filter(User.id == user_id).first()
+        return get_cached_entity(
+            db, User, user_id,
+            lambda: db.query(User).filter(User.id == user_id).first()
+        )
+    
+    @staticmethod
+    def get_users_by_ids(db: Session, user_ids: List[int]) -> List[User]:
+        """Users with the given ids in one IN query (unordered; missing ids are skipped)."""
+        return db.query(User).filter(User.id.in_(user_ids)).all()
     
     @staticmethod
     def get_user_by_username(db: Session, username: str) -> Optional[User]:
@@ -51,12 +66,46 @@ class UserService:
         return db.query(User).offset(skip).limit(limit).all()
     
     @staticmethod
-    def get_all_users(db: Session, role: Optional[str] = None) -> List[User]:
-        """Get all users, optionally filtered by role."""
+    def get_users_page(
+        db: Session,
+        limit: int,
+        role: Optional[str] = None,
+        username_prefix: Optional[str] = None,
+        after_username: Optional[str] = None,
+        options: Optional[list] = None
+    ) -> List[User]:
+        """
+        Keyset page of users ordered by username, starting after `after_username`.
+        Returns up to limit + 1 rows; the extra one tells the caller there is a next page.
+        Both the prefix search and the cursor are range scans on the username index.
+        """
         query = db.query(User)
         if role:
-            query = query.filter(User.role == role)
-        return query.all()
+            query = query.filter(User.role == UserRole(role))
+        if username_prefix:
+            escaped = username_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.filter(User.username.like(f"{escaped}%", escape="\\"))
+        if after_username is not None:
+            query = query.filter(User.username > after_username)
+        if options:
+            query = query.options(*options)
+        return query.order_by(User.username).limit(limit + 1).all()
+    
+    @staticmethod
+    def get_artist_stats(db: Session, artist_ids: List[int]) -> Dict[int, Tuple[int, float]]:
+        """Painting count and rating-weighted average rating per artist, in one grouped query."""
+        if not artist_ids:
+            return {}
+        rows = db.query(
+            Painting.artist_id,
+            func.count(Painting.id),
+            func.sum(Painting.average_rating * Painting.rating_count),
+            func.sum(Painting.rating_count)
+        ).filter(Painting.artist_id.in_(artist_ids)).group_by(Painting.artist_id).all()
+        return {
+            artist_id: (count, round(float(weighted) / ratings, 2) if ratings else 0.0)
+            for artist_id, count, weighted, ratings in rows
+        }
     
     @staticmethod
     def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
@@ -82,10 +131,12 @@ class UserService:
                 )
         
         # Update fields
-        for field, value in user_update.dict(exclude_unset=True).items():
+        for field, value in user_update.model_dump(exclude_unset=True).items():
             setattr(db_user, field, value)
         
         db.commit()
+        # Listings embed the artist
+        bump_catalog_version()
         db.refresh(db_user)
         return db_user
 
@@ -101,7 +152,7 @@ class CategoryService:
                 detail="Category name already exists"
             )
         
-        db_category = Category(**category.dict())
+        db_category = Category(**category.model_dump())
         db.add(db_category)
         db.commit()
         db.refresh(db_category)
@@ -111,9 +162,26 @@ class CategoryService:
     def get_categories(db: Session) -> List[Category]:
         return db.query(Category).all()
     
+    @staticmethod
+    def get_categories_state(db: Session) -> tuple:
+        """Count and newest row of the category table; used as a validator."""
+        return tuple(db.query(
+            func.count(Category.id), func.max(Category.id), func.max(Category.created_at)
+        ).one())
+    
+    @staticmethod
+    def get_existing_category_ids(db: Session, category_ids: List[int]) -> set:
+        """The subset of category_ids that exist, in one IN query."""
+        if not category_ids:
+            return set()
+        return {row.id for row in db.query(Category.id).filter(Category.id.in_(category_ids))}
+    
     @staticmethod
     def get_category(db: Session, category_id: int) -> Optional[Category]:
-        return db.query(Category).filter(Category.id == category_id).first()
+        return get_cached_entity(
+            db, Category, category_id,
+            lambda: db.query(Category).filter(Category.id == category_id).first()
+        )
 
 # Painting CRUD operations
 class PaintingService:
@@ -123,23 +191,69 @@ class PaintingService:
         painting: PaintingCreate, 
         artist_id: int, 
         image_url: str, 
-        thumbnail_url: str
+        thumbnail_url: str,
+        image_metadata: Optional[dict] = None
     ) -> Painting:
         db_painting = Painting(
-            **painting.dict(),
+            **painting.model_dump(),
+            **(image_metadata or {}),
             artist_id=artist_id,
             image_url=image_url,
             thumbnail_url=thumbnail_url,
+            bayesian_score=RatingService.get_rating_prior(db)[0],  # Unrated: the prior mean
             status="published"  # Set status to published by default
         )
         db.add(db_painting)
         db.commit()
+        bump_catalog_version()
         db.refresh(db_painting)
         return db_painting
     
+    @staticmethod
+    def create_paintings(db: Session, paintings: List[dict], artist_id: int) -> List[Painting]:
+        """
+        Insert several paintings in one transaction. Each item holds the
+        PaintingCreate fields plus image_url, thumbnail_url and image metadata.
+        """
+        mean, _ = RatingService.get_rating_prior(db)
+        db_paintings = [
+            Painting(**item, artist_id=artist_id, bayesian_score=mean, status=PaintingStatus.PUBLISHED)
+            for item in paintings
+        ]
+        db.add_all(db_paintings)
+        db.flush()
+        ids = [painting.id for painting in db_paintings]
+        db.commit()
+        bump_catalog_version()
+        
+        # Reload with relations in one query instead of one refresh per row
+        loaded = db.query(Painting).options(
+            joinedload(Painting.artist), joinedload(Painting.category)
+        ).filter(Painting.id.in_(ids)).all()
+        by_id = {painting.id: painting for painting in loaded}
+        return [by_id[painting_id] for painting_id in ids]
+    
     @staticmethod
     def get_painting(db: Session, painting_id: int) -> Optional[Painting]:
-        return db.query(Painting).filter(Painting.id == painting_id).first()
+        # Misses load artist and category eagerly; hits resolve them through their
+        # own cache entries, which user and category updates invalidate
+        return get_cached_entity(
+            db, Painting, painting_id,
+            lambda: db.query(Painting).options(
+                joinedload(Painting.artist), joinedload(Painting.category)
+            ).filter(Painting.id == painting_id).first(),
+            relations={
+                "artist": lambda user_id: UserService.get_user(db, user_id),
+                "category": lambda category_id: CategoryService.get_category(db, category_id),
+            }
+        )
+    
+    @staticmethod
+    def get_paintings_by_ids(db: Session, painting_ids: List[int]) -> List[Painting]:
+        """Paintings with the given ids in one IN query, artist and category loaded with them."""
+        return db.query(Painting).options(
+            joinedload(Painting.artist), joinedload(Painting.category)
+        ).filter(Painting.id.in_(painting_ids)).all()
     
     @staticmethod
     def get_paintings(
@@ -147,8 +261,10 @@ class PaintingService:
         skip: int = 0,
         limit: int = 10,
         filters: Optional[PaintingFilters] = None,
-        sort_by: Optional[SortOptions] = None
+        sort_by: Optional[SortOptions] = None,
+        options: Optional[list] = None
     ) -> Tuple[List[Painting], int]:
+        """`options` replaces the default loader options (artist and category eagerly loaded)."""
         query = db.query(Painting)
         
         # Only filter by published status if explicitly requested
@@ -193,6 +309,8 @@ class PaintingService:
                 query = query.order_by(desc(Painting.average_rating))
             elif sort_by == SortOptions.RATING_LOW:
                 query = query.order_by(asc(Painting.average_rating))
+            elif sort_by == SortOptions.BEST_RATED:
+                query = query.order_by(desc(Painting.bayesian_score), desc(Painting.id))
             elif sort_by == SortOptions.MOST_VIEWED:
                 query = query.order_by(desc(Painting.view_count))
             elif sort_by == SortOptions.TITLE_AZ:
@@ -203,20 +321,44 @@ class PaintingService:
             query = query.order_by(desc(Painting.created_at))
         
         total = query.count()
-        paintings = query.offset(skip).limit(limit).all()
+        # Artist and category are part of every item; load them with the page
+        if options is None:
+            options = [joinedload(Painting.artist), joinedload(Painting.category)]
+        paintings = query.options(*options).offset(skip).limit(limit).all()
         
         return paintings, total
     
+    @staticmethod
+    def get_related_paintings(
+        db: Session,
+        painting_id: int,
+        artist_id: int,
+        category_id: Optional[int],
+        limit: int = 8
+    ) -> List[Painting]:
+        """Other works by the same artist or in the same category, best rated first."""
+        related = [Painting.artist_id == artist_id]
+        if category_id:
+            related.append(Painting.category_id == category_id)
+        return db.query(Painting).options(
+            joinedload(Painting.artist), joinedload(Painting.category)
+        ).filter(
+            Painting.id != painting_id, or_(*related)
+        ).order_by(desc(Painting.average_rating), desc(Painting.rating_count)).limit(limit).all()
+    
     @staticmethod
     def get_user_paintings(
         db: Session, 
         user_id: int, 
         skip: int = 0, 
-        limit: int = 10
+        limit: int = 10,
+        options: Optional[list] = None
     ) -> Tuple[List[Painting], int]:
         query = db.query(Painting).filter(Painting.artist_id == user_id)
         total = query.count()
-        paintings = query.offset(skip).limit(limit).all()
+        if options is None:
+            options = [joinedload(Painting.artist), joinedload(Painting.category)]
+        paintings = query.options(*options).offset(skip).limit(limit).all()
         return paintings, total
     
     @staticmethod
@@ -233,10 +375,11 @@ class PaintingService:
         if not db_painting:
             return None
         
-        for field, value in painting_update.dict(exclude_unset=True).items():
+        for field, value in painting_update.model_dump(exclude_unset=True).items():
             setattr(db_painting, field, value)
         
         db.commit()
+        bump_catalog_version()
         db.refresh(db_painting)
         return db_painting
     
@@ -251,12 +394,14 @@ class PaintingService:
         
         db.delete(db_painting)
         db.commit()
+        bump_catalog_version()
         return True
     
     @staticmethod
     def increment_view_count(db: Session, painting_id: int) -> None:
+        # Keep updated_at: views are not edits, and it is the detail view's validator
         db.query(Painting).filter(Painting.id == painting_id).update(
-            {Painting.view_count: Painting.view_count + 1}
+            {Painting.view_count: Painting.view_count + 1, Painting.updated_at: Painting.updated_at}
         )
         db.commit()
 
@@ -268,16 +413,36 @@ class RatingService:
         rating_data: RatingCreate, 
         user_id: int
     ) -> Rating:
-        # Check if user has already rated this painting
-        existing_rating = db.query(Rating).filter(
-            and_(Rating.user_id == user_id, Rating.painting_id == rating_data.painting_id)
-        ).first()
+        # Changes to the painting's per-star counts: stars -> delta
+        star_deltas = {rating_data.rating: 1}
+        for _ in range(RATING_WRITE_ATTEMPTS):
+            # Check if user has already rated this painting; the row lock makes
+            # concurrent re-rates by the same user apply their deltas one at a time
+            existing_rating = db.query(Rating).filter(
+                and_(Rating.user_id == user_id, Rating.painting_id == rating_data.painting_id)
+            ).with_for_update().populate_existing().first()
+            if not existing_rating:
+                break
+            previous = existing_rating.rating
+            if previous == rating_data.rating:
+                star_deltas = {}
+                break
+            # Compare-and-set, for databases without row locks (SQLite): the deltas
+            # only apply if the rating is still the one they were computed from
+            updated = db.query(Rating).filter(
+                Rating.id == existing_rating.id, Rating.rating == previous
+            ).update({Rating.rating: rating_data.rating}, synchronize_session=False)
+            if updated:
+                star_deltas = {rating_data.rating: 1, previous: -1}
+                break
+        else:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The rating was changed concurrently, please retry"
+            )
         
         if existing_rating:
-            # Update existing rating
-            existing_rating.rating = rating_data.rating
-            db.commit()
-            db.refresh(existing_rating)
             rating_obj = existing_rating
         else:
             # Create new rating
@@ -287,11 +452,13 @@ class RatingService:
                 rating=rating_data.rating
             )
             db.add(rating_obj)
-            db.commit()
-            db.refresh(rating_obj)
         
-        # Update painting's average rating
-        RatingService._update_painting_rating_stats(db, rating_data.painting_id)
+        # The rating and the painting's counters are committed together
+        RatingService._update_painting_rating_stats(db, rating_data.painting_id, star_deltas)
+        db.commit()
+        db.refresh(rating_obj)
+        bump_catalog_version()
+        invalidate_entity(Painting, rating_data.painting_id)
         return rating_obj
     
     @staticmethod
@@ -301,27 +468,74 @@ class RatingService:
         ).first()
     
     @staticmethod
-    def get_painting_ratings(db: Session, painting_id: int) -> List[Rating]:
-        """Get all ratings for a specific painting"""
-        return db.query(Rating).filter(Rating.painting_id == painting_id).all()
+    def get_user_ratings(db: Session, user_id: int, painting_ids: List[int]) -> Dict[int, int]:
+        """A user's ratings of a page of paintings (painting id -> rating) in one IN query."""
+        if not painting_ids:
+            return {}
+        return dict(db.query(Rating.painting_id, Rating.rating).filter(
+            and_(Rating.user_id == user_id, Rating.painting_id.in_(painting_ids))
+        ).all())
     
     @staticmethod
-    def _update_painting_rating_stats(db: Session, painting_id: int) -> None:
-        # Calculate new average rating and count
-        result = db.query(
-            func.avg(Rating.rating).label('avg_rating'),
-            func.count(Rating.id).label('rating_count')
-        ).filter(Rating.painting_id == painting_id).first()
-        
-        avg_rating = float(result.avg_rating) if result.avg_rating else 0.0
-        rating_count = result.rating_count or 0
+    def get_painting_ratings(
+        db: Session,
+        painting_id: int,
+        limit: int = 20,
+        before_id: Optional[int] = None
+    ) -> List[Rating]:
+        """
+        Keyset page of a painting's ratings, newest first, starting below `before_id`.
+        Returns up to limit + 1 rows (the extra one signals a next page); raters are
+        loaded with one IN query instead of one lazy load per rating.
+        """
+        query = db.query(Rating).options(selectinload(Rating.user)).filter(Rating.painting_id == painting_id)
+        if before_id is not None:
+            query = query.filter(Rating.id < before_id)
+        return query.order_by(desc(Rating.id)).limit(limit + 1).all()
+    
+    @staticmethod
+    def _update_painting_rating_stats(db: Session, painting_id: int, star_deltas: Dict[int, int]) -> None:
+        """
+        Apply per-star count changes in SQL (safe against concurrent raters) and
+        derive the count and average from the star columns, without scanning
+        ratings. Runs in the caller's transaction; the caller commits.
+        """
+        if not star_deltas:
+            return
         
-        # Update painting
         db.query(Painting).filter(Painting.id == painting_id).update({
-            Painting.average_rating: round(avg_rating, 2),
-            Painting.rating_count: rating_count
-        })
-        db.commit()
+            getattr(Painting, f"stars_{stars}"): getattr(Painting, f"stars_{stars}") + delta
+            for stars, delta in star_deltas.items()
+        }, synchronize_session=False)
+        
+        mean, weight = RatingService.get_rating_prior(db)
+        db.query(Painting).filter(Painting.id == painting_id).update(
+            RatingService.rating_stats_values(mean, weight), synchronize_session=False
+        )
+    
+    @staticmethod
+    def get_rating_prior(db: Session) -> Tuple[float, int]:
+        """Global mean and weight for bayesian scores, as last stored by refresh_rating_scores.py."""
+        prior = db.get(RatingPrior, 1)
+        if prior is None:
+            return settings.bayesian_prior_mean, settings.bayesian_prior_weight
+        return prior.mean, prior.weight
+    
+    @staticmethod
+    def rating_stats_values(mean: float, weight: int) -> dict:
+        """
+        UPDATE values deriving rating count, average and bayesian score from the
+        star columns: score = (weight * mean + sum of ratings) / (weight + count),
+        which is the prior mean for an unrated painting.
+        """
+        stars = [getattr(Painting, f"stars_{value}") for value in range(1, 6)]
+        count = stars[0] + stars[1] + stars[2] + stars[3] + stars[4]
+        total = stars[0] + 2 * stars[1] + 3 * stars[2] + 4 * stars[3] + 5 * stars[4]
+        return {
+            Painting.rating_count: count,
+            Painting.average_rating: case((count > 0, func.round(total * 1.0 / count, 2)), else_=0.0),
+            Painting.bayesian_score: func.round((weight * mean + total) / (weight + count * 1.0), 4),
+        }
 
 # Comment CRUD operations
 class CommentService:
@@ -357,6 +571,19 @@ class CommentService:
             )
         ).offset(skip).limit(limit).all()
     
+    @staticmethod
+    def get_painting_comments_state(db: Session, painting_id: int) -> tuple:
+        """
+        Cheap aggregate that changes whenever a painting's comment thread does
+        (new, edited or deleted comments and edited authors); used as a validator.
+        """
+        return tuple(db.query(
+            func.count(Comment.id),
+            func.max(Comment.id),
+            func.max(Comment.updated_at),
+            func.max(User.updated_at)
+        ).join(Comment.user).filter(Comment.painting_id == painting_id).one())
+    
     @staticmethod
     def update_comment(
         db: Session, 
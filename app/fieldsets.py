@@ -0,0 +1,186 @@
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy.orm import joinedload, selectinload, load_only, noload
+from app.models import Painting, User, Category
+from app.schemas import PaintingResponse, UserResponse, CategoryResponse, absolute_media_url
+from app.responses import serialize_dict_page
+
+# Relation name -> (relationship, related model, foreign key column, fields)
+RELATIONS = {
+    "artist": (Painting.artist, User, "artist_id", list(UserResponse.model_fields)),
+    "category": (Painting.category, Category, "category_id", list(CategoryResponse.model_fields)),
+}
+PAINTING_FIELDS = [name for name in PaintingResponse.model_fields if name not in RELATIONS]
+USER_FIELDS = list(UserResponse.model_fields)
+DIRECTORY_FIELDS = ["painting_count", "average_rating"]
+URL_FIELDS = ("image_url", "thumbnail_url")
+# Relation name -> key of its map in a normalized page's `included`
+INCLUDED_KEYS = {"artist": "artists", "category": "categories"}
+
+class FieldSet:
+    """
+    Painting fields a client asked for: top-level columns plus, per embedded
+    relation, the list of its fields (None for all of them).
+    """
+
+    def __init__(self, columns: List[str], relations: Dict[str, Optional[List[str]]]):
+        self.columns = columns
+        self.relations = relations
+
+    @property
+    def key(self) -> str:
+        """Canonical form, for cache keys and ETags."""
+        relations = ";".join(
+            f"{name}:{','.join(sorted(fields)) if fields else '*'}"
+            for name, fields in sorted(self.relations.items())
+        )
+        return f"{','.join(sorted(self.columns))}|{relations}"
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def _unknown_field(name: str, allowed: List[str]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Unknown field '{name}'. Allowed: {', '.join(allowed)}"
+    )
+
+def parse_painting_fields(fields: Optional[str], include: Optional[str]) -> Optional[FieldSet]:
+    """
+    Parse `fields` (columns, and `artist.username` style names for sparse
+    relations) and `include` (relations embedded in full). Returns None when
+    neither is given, i.e. the full representation.
+    """
+    if fields is None and include is None:
+        return None
+
+    relations: Dict[str, Optional[List[str]]] = {}
+    for name in _split(include or ""):
+        if name not in RELATIONS:
+            raise _unknown_field(name, list(RELATIONS))
+        relations[name] = None
+
+    if fields is None:
+        return FieldSet(list(PAINTING_FIELDS), relations)
+
+    columns = ["id"]
+    for name in _split(fields):
+        relation, _, field = name.partition(".")
+        if field:
+            if relation not in RELATIONS:
+                raise _unknown_field(name, list(RELATIONS))
+            if field not in RELATIONS[relation][3]:
+                raise _unknown_field(name, RELATIONS[relation][3])
+            if relations.get(relation, []) is not None:
+                relations.setdefault(relation, []).append(field)
+        elif name in RELATIONS:
+            relations[name] = None
+        elif name in PAINTING_FIELDS:
+            if name not in columns:
+                columns.append(name)
+        else:
+            raise _unknown_field(name, PAINTING_FIELDS + list(RELATIONS))
+    return FieldSet(columns, relations)
+
+def full_fieldset(fieldset: Optional[FieldSet]) -> FieldSet:
+    """
+    Field set for pages built as dicts (normalized or viewer-annotated): the
+    requested one, or the full representation with artist and category.
+    """
+    return fieldset or FieldSet(list(PAINTING_FIELDS), {name: None for name in RELATIONS})
+
+def parse_user_fields(fields: Optional[str], extra: List[str] = ()) -> Optional[List[str]]:
+    """Parse `fields` for user responses (plus `extra` computed fields); None means all fields."""
+    if fields is None:
+        return None
+    allowed = USER_FIELDS + list(extra)
+    columns = ["id"]
+    for name in _split(fields):
+        if name not in allowed:
+            raise _unknown_field(name, allowed)
+        if name not in columns:
+            columns.append(name)
+    return columns
+
+def painting_load_options(fieldset: FieldSet, normalize: bool = False) -> list:
+    """
+    Loader options selecting only the columns and relations the field set needs.
+    Normalized pages load relations with one IN query per relation, so an
+    artist shared by the whole page is fetched once instead of once per row.
+    """
+    columns = set(fieldset.columns)
+    options = []
+    for name, (relationship, model, foreign_key, _) in RELATIONS.items():
+        if name not in fieldset.relations:
+            options.append(noload(relationship))
+            continue
+        columns.add(foreign_key)
+        fields = fieldset.relations[name]
+        loader = selectinload(relationship) if normalize else joinedload(relationship)
+        if fields:
+            loader = loader.load_only(*(getattr(model, field) for field in fields))
+        options.append(loader)
+    options.append(load_only(*(getattr(Painting, column) for column in columns)))
+    return options
+
+def user_load_options(fields: List[str]) -> list:
+    return [load_only(*(getattr(User, field) for field in fields))]
+
+def _dump(instance, fields: List[str]) -> dict:
+    data = {field: getattr(instance, field) for field in fields}
+    for field in URL_FIELDS:
+        if field in data:
+            data[field] = absolute_media_url(data[field])
+    return data
+
+def serialize_painting(painting: Painting, fieldset: FieldSet) -> dict:
+    """Plain dict of the requested fields; orjson encodes datetimes and enums like pydantic does."""
+    data = _dump(painting, fieldset.columns)
+    for name, fields in fieldset.relations.items():
+        related = getattr(painting, name)
+        data[name] = _dump(related, fields or RELATIONS[name][3]) if related is not None else None
+    return data
+
+def serialize_user(user: User, fields: List[str]) -> dict:
+    return _dump(user, fields)
+
+def serialize_normalized(paintings: List[Painting], fieldset: FieldSet) -> Tuple[List[dict], dict]:
+    """
+    Items reference their artist and category by id; each distinct artist and
+    category is serialized once into the `included` maps, keyed by id.
+    """
+    included = {INCLUDED_KEYS[name]: {} for name in fieldset.relations}
+    items = []
+    for painting in paintings:
+        data = _dump(painting, fieldset.columns)
+        for name, fields in fieldset.relations.items():
+            foreign_key = RELATIONS[name][2]
+            related_id = data[foreign_key] = getattr(painting, foreign_key)
+            related = included[INCLUDED_KEYS[name]]
+            if related_id is not None and str(related_id) not in related:
+                related[str(related_id)] = _dump(getattr(painting, name), fields or RELATIONS[name][3])
+        items.append(data)
+    return items, included
+
+def serialize_painting_page(
+    paintings: List[Painting],
+    fieldset: FieldSet,
+    total: int,
+    page: int,
+    limit: int,
+    normalize: bool = False,
+    viewer_ratings: Optional[Dict[int, int]] = None
+) -> bytes:
+    """
+    JSON body of a sparse and/or normalized page of paintings. With
+    `viewer_ratings` (painting id -> the viewer's rating) every item gets a
+    `viewer` object with the viewer's own state.
+    """
+    if normalize:
+        items, included = serialize_normalized(paintings, fieldset)
+    else:
+        items, included = [serialize_painting(painting, fieldset) for painting in paintings], None
+    if viewer_ratings is not None:
+        for item in items:
+            item["viewer"] = {"rating": viewer_ratings.get(item["id"])}
+    return serialize_dict_page(items, total, page, limit, included=included)
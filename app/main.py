@@ -1,11 +1,13 @@
 from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.security import HTTPBearer
 from sqlalchemy.exc import SQLAlchemyError
 from app.database import engine, Base
-from app.routers import auth, users, categories, paintings, ratings, comments
+from app.routers import auth, users, categories, paintings, ratings, comments, media, uploads
+from app.config import settings
+from app.compression import CompressionMiddleware
 import os
 
 # Create database tables
@@ -37,7 +39,8 @@ app = FastAPI(
     """,
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configure security scheme for OpenAPI
@@ -52,13 +55,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip / Brotli compression for API responses (uploaded media is skipped)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
+
 # Create upload directory if it doesn't exist
 os.makedirs("uploads", exist_ok=True)
 os.makedirs("uploads/paintings", exist_ok=True)
 os.makedirs("uploads/paintings/thumbnails", exist_ok=True)
 
-# Mount static files for serving uploaded images
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Serve uploaded images: plain static files, or the media delivery path
+# (sendfile / X-Accel-Redirect / X-Sendfile) selected by MEDIA_DELIVERY_MODE
+if settings.media_delivery_mode == "static":
+    app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+else:
+    app.include_router(media.router)
 
 # Include routers
 app.include_router(auth.router)
@@ -67,6 +77,7 @@ app.include_router(categories.router)
 app.include_router(paintings.router)
 app.include_router(ratings.router)
 app.include_router(comments.router)
+app.include_router(uploads.router)
 
 # Global exception handler
 @app.exception_handler(SQLAlchemyError)
@@ -0,0 +1,226 @@
+import os
+import re
+import mimetypes
+import secrets
+from email.utils import formatdate
+from typing import List, Optional, Tuple
+import anyio
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response
+from starlette.types import Receive, Scope, Send
+from app.config import settings
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+RANGE_PATTERN = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+def resolve_media_path(relative_path: str) -> Optional[str]:
+    """Map a path below /uploads to a file inside the upload directory."""
+    root = os.path.realpath(settings.upload_dir)
+    full_path = os.path.realpath(os.path.join(root, relative_path.lstrip("/")))
+
+    # Refuse anything that escapes the upload directory (e.g. "../")
+    if os.path.commonpath([root, full_path]) != root:
+        return None
+    if not os.path.isfile(full_path):
+        return None
+    return full_path
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a Range header into a sorted list of merged (start, end) byte ranges.
+    End offsets are exclusive. Returns None when the header should be ignored
+    and an empty list when no requested range is satisfiable.
+    """
+    units, _, range_spec = range_header.partition("=")
+    if units.strip().lower() != "bytes" or not range_spec:
+        return None
+
+    ranges = []
+    for part in range_spec.split(","):
+        match = RANGE_PATTERN.match(part)
+        if not match:
+            return None
+        first, last = match.groups()
+        if not first and not last:
+            return None
+
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(file_size - length, 0), file_size
+        else:
+            start = int(first)
+            end = min(int(last) + 1, file_size) if last else file_size
+            if last and int(last) < start:
+                return None
+
+        if start < file_size:
+            ranges.append((start, end))
+
+    # Merge overlapping and adjacent ranges
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+class SendfileResponse(Response):
+    """
+    File response with single and multi-range support.
+
+    Uses the ASGI zero-copy send extension (os.sendfile in the server) when the
+    server advertises it, otherwise falls back to reading chunks off the event loop.
+    """
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        ranges: Optional[List[Tuple[int, int]]] = None,
+        headers: Optional[dict] = None,
+        media_type: Optional[str] = None,
+        send_body: bool = True
+    ):
+        self.path = path
+        self.file_size = stat_result.st_size
+        self.ranges = ranges or []
+        self.send_body = send_body
+        self.media_type = media_type or "application/octet-stream"
+        self.background = None
+        self.parts: List[Tuple[bytes, int, int]] = []
+        self.trailer = b""
+
+        if len(self.ranges) == 1:
+            start, end = self.ranges[0]
+            self.status_code = status.HTTP_206_PARTIAL_CONTENT
+            content_length = end - start
+            content_type = self.media_type
+            self.parts = [(b"", start, end)]
+        elif len(self.ranges) > 1:
+            boundary = secrets.token_hex(16)
+            self.status_code = status.HTTP_206_PARTIAL_CONTENT
+            content_type = f"multipart/byteranges; boundary={boundary}"
+            content_length = 0
+            for index, (start, end) in enumerate(self.ranges):
+                part_header = (
+                    ("\r\n" if index else "")
+                    + f"--{boundary}\r\n"
+                    + f"Content-Type: {self.media_type}\r\n"
+                    + f"Content-Range: bytes {start}-{end - 1}/{self.file_size}\r\n\r\n"
+                ).encode("latin-1")
+                self.parts.append((part_header, start, end))
+                content_length += len(part_header) + end - start
+            self.trailer = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            content_length += len(self.trailer)
+        else:
+            self.status_code = status.HTTP_200_OK
+            content_length = self.file_size
+            content_type = self.media_type
+            self.parts = [(b"", 0, self.file_size)]
+
+        self.init_headers(headers)
+        self.headers["content-type"] = content_type
+        self.headers["content-length"] = str(content_length)
+        if len(self.ranges) == 1:
+            start, end = self.ranges[0]
+            self.headers["content-range"] = f"bytes {start}-{end - 1}/{self.file_size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if not self.send_body:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = ZEROCOPY_EXTENSION in (scope.get("extensions") or {})
+
+        with open(self.path, "rb") as file:
+            for part_header, start, end in self.parts:
+                if part_header:
+                    await send({"type": "http.response.body", "body": part_header, "more_body": True})
+                if zerocopy:
+                    await send({
+                        "type": ZEROCOPY_EXTENSION,
+                        "file": file,
+                        "offset": start,
+                        "count": end - start,
+                        "more_body": True,
+                    })
+                else:
+                    await self._send_chunks(send, file.fileno(), start, end)
+
+        await send({"type": "http.response.body", "body": self.trailer, "more_body": False})
+
+    async def _send_chunks(self, send: Send, fd: int, start: int, end: int) -> None:
+        offset = start
+        while offset < end:
+            chunk = await anyio.to_thread.run_sync(os.pread, fd, min(self.chunk_size, end - offset), offset)
+            if not chunk:
+                break
+            offset += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+def media_response(request: Request, relative_path: str) -> Response:
+    """
+    Build the response that delivers an uploaded file.
+    Call this only after any authorization checks for the file have passed.
+    """
+    file_path = resolve_media_path(relative_path)
+    if not file_path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+
+    stat_result = os.stat(file_path)
+
+    media_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+    headers = {
+        "accept-ranges": "bytes",
+        "cache-control": f"public, max-age={settings.media_cache_max_age}",
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+    }
+
+    # Offload modes: the fronting web server streams the bytes (and handles ranges)
+    mode = settings.media_delivery_mode
+    if mode == "x-accel-redirect":
+        prefix = settings.media_accel_redirect_prefix.rstrip("/")
+        internal_path = os.path.relpath(file_path, os.path.realpath(settings.upload_dir))
+        headers["x-accel-redirect"] = f"{prefix}/{internal_path}"
+        return Response(headers=headers, media_type=media_type)
+    if mode == "x-sendfile":
+        headers["x-sendfile"] = file_path
+        return Response(headers=headers, media_type=media_type)
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    ranges = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range in (etag, headers["last-modified"])):
+        ranges = parse_range_header(range_header, stat_result.st_size)
+        if ranges == []:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"content-range": f"bytes */{stat_result.st_size}"}
+            )
+
+    return SendfileResponse(
+        file_path,
+        stat_result,
+        ranges=ranges,
+        headers=headers,
+        media_type=media_type,
+        send_body=request.method != "HEAD"
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, Boolean, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, Boolean, Enum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -54,6 +54,14 @@ class Painting(Base):
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     image_url = Column(String(500), nullable=False)
     thumbnail_url = Column(String(500), nullable=True)
+    image_width = Column(Integer, nullable=True)  # Pixel dimensions of the original
+    image_height = Column(Integer, nullable=True)
+    dominant_color = Column(String(7), nullable=True)  # e.g., "#a1b2c3"
+    blurhash = Column(String(64), nullable=True)  # Placeholder shown while the thumbnail loads
+    tiles_ready = Column(Boolean, default=False, nullable=False)  # Deep zoom pyramid generated
+    # Bytes saved by image optimization per file, NULL if not run or it failed
+    original_bytes_saved = Column(Integer, nullable=True)
+    thumbnail_bytes_saved = Column(Integer, nullable=True)
     price = Column(Float, nullable=True)  # Optional for selling
     year_created = Column(Integer, nullable=True)
     dimensions = Column(String(100), nullable=True)  # e.g., "24x36 inches"
@@ -62,6 +70,14 @@ class Painting(Base):
     view_count = Column(Integer, default=0, nullable=False)
     average_rating = Column(Float, default=0.0, nullable=False)
     rating_count = Column(Integer, default=0, nullable=False)
+    # Number of 1..5 star ratings, kept in step with each rating write
+    stars_1 = Column(Integer, default=0, nullable=False)
+    stars_2 = Column(Integer, default=0, nullable=False)
+    stars_3 = Column(Integer, default=0, nullable=False)
+    stars_4 = Column(Integer, default=0, nullable=False)
+    stars_5 = Column(Integer, default=0, nullable=False)
+    # Average blended with the global prior (RatingPrior); the prior mean until rated. Indexed for the best_rated sort
+    bayesian_score = Column(Float, default=0.0, nullable=False, index=True)
     tags = Column(String(500), nullable=True)  # Comma-separated tags
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -71,6 +87,11 @@ class Painting(Base):
     category = relationship("Category", back_populates="paintings")
     ratings = relationship("Rating", back_populates="painting", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="painting", cascade="all, delete-orphan")
+    
+    @property
+    def rating_histogram(self) -> dict:
+        """Stars (1-5) -> number of ratings."""
+        return {stars: getattr(self, f"stars_{stars}") for stars in range(1, 6)}
 
 class Rating(Base):
     __tablename__ = "ratings"
@@ -86,9 +107,10 @@ class Rating(Base):
     user = relationship("User", back_populates="ratings")
     painting = relationship("Painting", back_populates="ratings")
     
-    # Ensure one rating per user per painting
+    # Ensure one rating per user per painting; the index serves keyset pages of a painting's ratings
     __table_args__ = (
         UniqueConstraint('user_id', 'painting_id', name='unique_user_painting_rating'),
+        Index('ix_ratings_painting_id_id', 'painting_id', 'id'),
     )
 
 class Comment(Base):
@@ -107,3 +129,12 @@ class Comment(Base):
     user = relationship("User", back_populates="comments")
     painting = relationship("Painting", back_populates="comments")
     parent = relationship("Comment", remote_side=[id], backref="replies")
+
+class RatingPrior(Base):
+    __tablename__ = "rating_prior"
+    
+    # Single row: the global mean and weight the stored bayesian scores were computed with
+    id = Column(Integer, primary_key=True)
+    mean = Column(Float, nullable=False)
+    weight = Column(Integer, nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,108 @@
+import os
+import shutil
+import logging
+import subprocess
+from typing import Optional
+from PIL import Image, ImageOps
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Painting
+from app.utils import media_url_to_path
+
+logger = logging.getLogger(__name__)
+
+# EXIF orientation -> lossless jpegtran transform that applies it
+JPEGTRAN_ORIENTATION = {
+    2: ["-flip", "horizontal"],
+    3: ["-rotate", "180"],
+    4: ["-flip", "vertical"],
+    5: ["-transpose"],
+    6: ["-rotate", "90"],
+    7: ["-transverse"],
+    8: ["-rotate", "270"],
+}
+
+def _jpegtran(source: str, target: str, transform: list, copy: str) -> bool:
+    # -perfect makes a transform fail instead of trimming partial edge blocks
+    perfect = ["-perfect"] if transform else []
+    result = subprocess.run(
+        [settings.jpegtran_path, "-optimize", "-progressive", "-copy", copy,
+         *perfect, *transform, "-outfile", target, source],
+        capture_output=True
+    )
+    return result.returncode == 0
+
+def _optimize_jpeg(path: str, target: str) -> bool:
+    """
+    Losslessly rewrite a JPEG with optimized Huffman tables and progressive
+    scans, stripping metadata except the ICC profile. EXIF orientation is
+    applied to the pixels first; if that can't be done losslessly the
+    metadata is kept so the image still displays upright.
+    """
+    if not shutil.which(settings.jpegtran_path):
+        return False
+
+    with Image.open(path) as img:
+        orientation = img.getexif().get(0x0112, 1)
+
+    transform = JPEGTRAN_ORIENTATION.get(orientation, [])
+    if _jpegtran(path, target, transform, "icc"):
+        return True
+    return _jpegtran(path, target, [], "all")
+
+def _optimize_png(path: str, target: str) -> bool:
+    """Recompress a PNG losslessly, applying orientation and keeping the ICC profile."""
+    with Image.open(path) as img:
+        icc_profile = img.info.get("icc_profile")
+        img = ImageOps.exif_transpose(img)
+        img.save(target, "PNG", optimize=True, icc_profile=icc_profile)
+    return True
+
+OPTIMIZERS = {"JPEG": _optimize_jpeg, "PNG": _optimize_png}
+
+def optimize_image_file(path: Optional[str]) -> Optional[int]:
+    """
+    Optimize a stored image in place and return the bytes saved, or None if
+    the file does not exist. The file is only replaced when the optimized copy
+    is smaller.
+    """
+    if not path or not os.path.exists(path):
+        return None
+
+    with Image.open(path) as img:
+        optimizer = OPTIMIZERS.get(img.format)
+    if optimizer is None:
+        return 0
+
+    target = f"{path}.optimized"
+    try:
+        if not optimizer(path, target) or not os.path.exists(target):
+            return 0
+        saved = os.path.getsize(path) - os.path.getsize(target)
+        if saved <= 0:
+            return 0
+        os.replace(target, path)
+        return saved
+    finally:
+        if os.path.exists(target):
+            os.remove(target)
+
+def optimize_painting_images(painting_id: int, image_url: str, thumbnail_url: Optional[str]) -> None:
+    """
+    Background job: optimize a painting's original and thumbnail and record
+    each file's savings; a file that is missing or failed to optimize stays NULL.
+    """
+    savings = {}
+    for column, url in ((Painting.original_bytes_saved, image_url), (Painting.thumbnail_bytes_saved, thumbnail_url)):
+        savings[column] = None
+        try:
+            savings[column] = optimize_image_file(media_url_to_path(url))
+        except Exception:
+            logger.exception("Optimizing %s failed", url)
+
+    db = SessionLocal()
+    try:
+        db.query(Painting).filter(Painting.id == painting_id).update(savings, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,61 @@
+import base64
+import binascii
+import orjson
+from typing import List, Optional, Type
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from app.schemas import PaginatedResponse
+
+def serialize_page(schema: Type[BaseModel], items: List, total: int, page: int, limit: int) -> bytes:
+    """
+    Validate ORM rows against `schema` once and serialize the page straight to
+    JSON bytes with pydantic-core. Routes return these bytes in a Response,
+    so FastAPI doesn't validate and encode the same page a second time.
+    """
+    paginated = PaginatedResponse[schema].model_validate(
+        {
+            "items": items,
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "pages": (total + limit - 1) // limit,
+        },
+        from_attributes=True
+    )
+    return paginated.model_dump_json().encode()
+
+def serialize_dict_page(
+    items: List[dict],
+    total: int,
+    page: int,
+    limit: int,
+    included: Optional[dict] = None
+) -> bytes:
+    """Serialize a page of already built item dicts (e.g. sparse fieldsets) with orjson."""
+    content = {
+        "items": items,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "pages": (total + limit - 1) // limit,
+    }
+    if included is not None:
+        content["included"] = included
+    return orjson.dumps(content)
+
+def encode_cursor(value: str) -> str:
+    """Opaque cursor for keyset pagination."""
+    return base64.urlsafe_b64encode(value.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def json_bytes_response(body: bytes, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """Response for an already serialized JSON body."""
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import uuid
+import base64
+import binascii
+import fcntl
+from typing import AsyncIterator, Optional
+import aiofiles
+from fastapi import UploadFile, HTTPException, status
+from starlette.datastructures import Headers
+from app.config import settings
+from app.utils import validate_image_extension
+
+TUS_VERSION = "1.0.0"
+
+def _upload_paths(upload_id: str) -> tuple[str, str]:
+    # Upload ids are generated by us; anything else is rejected before touching disk
+    try:
+        uuid.UUID(upload_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    base = os.path.join(settings.resumable_upload_dir, upload_id)
+    return f"{base}.part", f"{base}.json"
+
+def parse_upload_length(header: str) -> int:
+    """Parse a tus Upload-Length header: a non-negative integer, within the upload size limit."""
+    if not (header.isascii() and header.isdigit()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload-Length must be a non-negative integer"
+        )
+    length = int(header)
+    if length > settings.max_file_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size too large. Maximum size: {settings.max_file_size / 1024 / 1024:.1f}MB"
+        )
+    return length
+
+def parse_upload_metadata(header: Optional[str]) -> dict:
+    """Parse a tus Upload-Metadata header ("key base64value,key2 base64value2")."""
+    metadata = {}
+    for pair in (header or "").split(","):
+        key, _, value = pair.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode("utf-8") if value else ""
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Upload-Metadata value for '{key}' is not valid base64-encoded UTF-8"
+            )
+    return metadata
+
+def create_upload(length: int, filename: str) -> str:
+    """Register a new resumable upload and return its id; `length` comes from parse_upload_length()."""
+    # The name decides the format check at POST /paintings/, so fail before any bytes are sent
+    validate_image_extension(filename)
+    os.makedirs(settings.resumable_upload_dir, exist_ok=True)
+    upload_id = str(uuid.uuid4())
+    part_path, info_path = _upload_paths(upload_id)
+
+    open(part_path, "wb").close()
+    with open(info_path, "w") as f:
+        json.dump({"length": length, "filename": filename, "created_at": time.time()}, f)
+    return upload_id
+
+def get_upload(upload_id: str) -> dict:
+    """Return upload info; the offset is the size of the staged data on disk."""
+    part_path, info_path = _upload_paths(upload_id)
+    if not os.path.exists(info_path) or not os.path.exists(part_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+
+    with open(info_path) as f:
+        info = json.load(f)
+    info["offset"] = os.path.getsize(part_path)
+
+    expires_at = info["created_at"] + settings.resumable_upload_expiry_hours * 3600
+    if time.time() > expires_at:
+        discard_upload(upload_id)
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Upload expired"
+        )
+    return info
+
+async def append_chunk(upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> int:
+    """
+    Append a request body at the given offset and return the new offset.
+    Writers hold an exclusive lock on the staged file for the whole append, so
+    a concurrent PATCH to the same upload gets 423 instead of interleaving.
+    """
+    info = get_upload(upload_id)
+    part_path, _ = _upload_paths(upload_id)
+
+    with open(part_path, "ab") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise HTTPException(
+                status_code=status.HTTP_423_LOCKED,
+                detail="Another request is writing to this upload"
+            )
+
+        # Checked under the lock: an append that just finished moved the offset
+        current_offset = os.path.getsize(part_path)
+        if offset != current_offset:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload-Offset mismatch, current offset is {current_offset}"
+            )
+
+        written = offset
+        async with aiofiles.open(part_path, "ab") as f:
+            async for chunk in chunks:
+                if written + len(chunk) > info["length"]:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Chunk exceeds the declared Upload-Length"
+                    )
+                await f.write(chunk)
+                written += len(chunk)
+    return written
+
+def open_completed_upload(upload_id: str) -> UploadFile:
+    """Open a finished upload as an UploadFile for the regular save_image pipeline."""
+    info = get_upload(upload_id)
+    if info["offset"] != info["length"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload incomplete: {info['offset']} of {info['length']} bytes received"
+        )
+
+    part_path, _ = _upload_paths(upload_id)
+    return UploadFile(
+        file=open(part_path, "rb"),
+        size=info["length"],
+        filename=info["filename"],
+        headers=Headers({"content-type": "application/octet-stream"})
+    )
+
+def discard_upload(upload_id: str) -> None:
+    """Remove the staged data of an upload."""
+    for path in _upload_paths(upload_id):
+        if os.path.exists(path):
+            os.remove(path)
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
 from app.schemas import CategoryCreate, CategoryResponse
 from app.crud import CategoryService
+from app.conditional import make_etag, conditional_response
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
@@ -16,17 +17,26 @@ def create_category(
     return CategoryService.create_category(db, category)
 
 @router.get("/", response_model=List[CategoryResponse])
-def get_categories(db: Session = Depends(get_db)):
-    """Get all categories."""
+def get_categories(request: Request, response: Response, db: Session = Depends(get_db)):
+    """Get all categories (supports If-None-Match / If-Modified-Since)."""
+    count, max_id, last_created = CategoryService.get_categories_state(db)
+    not_modified = conditional_response(request, response, make_etag(count, max_id, last_created), last_created)
+    if not_modified:
+        return not_modified
     return CategoryService.get_categories(db)
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-def get_category(category_id: int, db: Session = Depends(get_db)):
-    """Get category by ID."""
+def get_category(category_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """Get category by ID (supports If-None-Match)."""
     category = CategoryService.get_category(db, category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
+    not_modified = conditional_response(
+        request, response, make_etag(category.id, category.name, category.description), category.created_at
+    )
+    if not_modified:
+        return not_modified
     return category
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
 from app.schemas import CommentCreate, CommentUpdate, CommentResponse
 from app.crud import CommentService, PaintingService
+from app.conditional import make_etag, conditional_response
 
 router = APIRouter(prefix="/comments", tags=["Comments"])
 
@@ -27,11 +28,13 @@ def create_comment(
 @router.get("/painting/{painting_id}", response_model=List[CommentResponse])
 def get_painting_comments(
     painting_id: int,
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=50),
     db: Session = Depends(get_db)
 ):
-    """Get comments for a painting."""
+    """Get comments for a painting (supports If-None-Match)."""
     # Check if painting exists
     painting = PaintingService.get_painting(db, painting_id)
     if not painting:
@@ -40,6 +43,12 @@ def get_painting_comments(
             detail="Painting not found"
         )
     
+    # One aggregate query decides whether the thread has to be loaded at all
+    state = CommentService.get_painting_comments_state(db, painting_id)
+    not_modified = conditional_response(request, response, make_etag(painting_id, skip, limit, *state))
+    if not_modified:
+        return not_modified
+    
     return CommentService.get_painting_comments(db, painting_id, skip, limit)
 
 @router.put("/{comment_id}", response_model=CommentResponse)
@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Request
+from app.media import media_response
+
+router = APIRouter(prefix="/uploads", tags=["Media"])
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+def get_media(file_path: str, request: Request):
+    """Serve an uploaded file (originals, thumbnails) with range support."""
+    return media_response(request, file_path)
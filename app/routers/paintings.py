@@ -1,16 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Form
+import os
+import json
+import asyncio
+import shutil
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Form, Request, Response
+from fastapi.responses import ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_db, SessionLocal
+from pydantic import ValidationError
 from app.schemas import (
     PaintingCreate, PaintingUpdate, PaintingResponse, PaintingListResponse,
-    PaginatedResponse, PaintingFilters, SortOptions
+    PaginatedResponse, PaintingFilters, SortOptions, CommentResponse, PaintingDetailResponse,
+    BatchUploadItemResult, BatchUploadResponse, PaintingBatchResponse, SpriteSheetResponse
 )
-from app.crud import PaintingService
-from app.models import User
-from app.utils import save_image, delete_image_files
+from app.crud import PaintingService, CommentService, RatingService, CategoryService
+from app.models import User, Painting
+from app.utils import save_image, delete_image_files, parse_id_list
+from app.media import media_response
+from app.resumable import open_completed_upload, discard_upload
+from app.background import submit_job
+from app.tiles import tile_directory, needs_tiles, build_painting_tiles
+from app.optimize import optimize_painting_images
+from app.sprites import get_sprite_sheet, sprite_directory
+from app.cache import response_cache, listing_cache_key
+from app.conditional import make_etag, conditional_response, validator_headers, is_not_modified
+from app.responses import serialize_page, json_bytes_response
+from app.fieldsets import (
+    parse_painting_fields, full_fieldset, painting_load_options,
+    serialize_painting, serialize_painting_page
+)
+from app.compression import negotiate_encoding, compress, PRECOMPRESSED_LEVELS
+from app.config import settings
 
 router = APIRouter(prefix="/paintings", tags=["Paintings"])
+logger = logging.getLogger(__name__)
+
+def _post_upload_jobs(painting_id: int, image_url: str, thumbnail_url: str, build_tiles: bool) -> None:
+    if settings.optimize_images:
+        optimize_painting_images(painting_id, image_url, thumbnail_url)
+    if build_tiles:
+        build_painting_tiles(painting_id, image_url)
+
+def schedule_post_upload_jobs(painting: Painting, image_metadata: Optional[dict]) -> None:
+    """Queue image optimization and, for large originals, the deep zoom pyramid."""
+    build_tiles = needs_tiles(image_metadata)
+    if settings.optimize_images or build_tiles:
+        submit_job(_post_upload_jobs, painting.id, painting.image_url, painting.thumbnail_url, build_tiles)
 
 @router.post("/", response_model=PaintingResponse, status_code=status.HTTP_201_CREATED)
 async def create_painting(
@@ -23,12 +60,27 @@ async def create_painting(
     medium: Optional[str] = Form(None),
     tags: Optional[str] = Form(None),
     artist_id: int = Form(...),  # Now require artist_id as form parameter
-    image: UploadFile = File(...),
+    image: Optional[UploadFile] = File(None),
+    upload_id: Optional[str] = Form(None, description="Completed resumable upload to use instead of image"),
     db: Session = Depends(get_db)
 ):
-    """Create a new painting with image upload."""
+    """Create a new painting with image upload (or a completed resumable upload)."""
+    if upload_id:
+        image = open_completed_upload(upload_id)
+    elif image is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either image or upload_id is required"
+        )
+    
     # Save uploaded image
-    image_url, thumbnail_url = await save_image(image, "paintings", "http://localhost:8000")
+    try:
+        image_url, thumbnail_url, image_metadata = await save_image(image, "paintings", "http://localhost:8000")
+    finally:
+        if upload_id:
+            await image.close()
+    if upload_id:
+        discard_upload(upload_id)
     
     try:
         # Create painting data
@@ -45,17 +97,135 @@ async def create_painting(
         
         # Create painting in database
         painting = PaintingService.create_painting(
-            db, painting_data, artist_id, image_url, thumbnail_url
+            db, painting_data, artist_id, image_url, thumbnail_url, image_metadata
         )
         
+        schedule_post_upload_jobs(painting, image_metadata)
+        
         return painting
     except Exception as e:
         # Clean up uploaded files if database operation fails
         delete_image_files(image_url, thumbnail_url)
         raise e
 
+@router.post("/batch", response_model=BatchUploadResponse, status_code=status.HTTP_201_CREATED)
+async def create_paintings_batch(
+    artist_id: int = Form(...),
+    metadata: str = Form(..., description="JSON array with one painting object per image, in upload order"),
+    images: List[UploadFile] = File(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Create several paintings in one request. Images are processed concurrently,
+    the paintings are inserted in one transaction and each item reports its own
+    result, so a bad image does not fail the whole batch.
+    """
+    if len(images) > settings.batch_upload_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many images. Maximum per batch: {settings.batch_upload_max_items}"
+        )
+    
+    try:
+        items = json.loads(metadata)
+    except json.JSONDecodeError:
+        items = None
+    if not isinstance(items, list) or len(items) != len(images):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="metadata must be a JSON array with one object per image"
+        )
+    
+    results = [BatchUploadItemResult(index=i, filename=image.filename) for i, image in enumerate(images)]
+    semaphore = asyncio.Semaphore(settings.batch_upload_concurrency)
+    
+    validated: List[Optional[PaintingCreate]] = []
+    for index, item in enumerate(items):
+        try:
+            validated.append(PaintingCreate.model_validate(item))
+        except ValidationError as e:
+            results[index].error = f"Invalid metadata: {e.errors()[0]['msg']}"
+            validated.append(None)
+    
+    # Unknown categories would fail the whole insert on the foreign key, so they
+    # are looked up once here and reported per item before any image is saved
+    category_ids = CategoryService.get_existing_category_ids(db, list({
+        painting_data.category_id for painting_data in validated
+        if painting_data is not None and painting_data.category_id is not None
+    }))
+    
+    async def process(index: int):
+        painting_data = validated[index]
+        if painting_data is None:
+            return None
+        if painting_data.category_id is not None and painting_data.category_id not in category_ids:
+            results[index].error = f"Category {painting_data.category_id} not found"
+            return None
+        
+        async with semaphore:
+            try:
+                image_url, thumbnail_url, image_metadata = await save_image(
+                    images[index], "paintings", "http://localhost:8000"
+                )
+            except HTTPException as e:
+                results[index].error = e.detail
+                return None
+            except Exception:
+                # One unreadable or unwritable image must not fail the rest of the batch
+                logger.exception("Batch upload item %d (%s) failed", index, images[index].filename)
+                results[index].error = "Could not process image"
+                return None
+        
+        return index, {
+            **painting_data.model_dump(),
+            **image_metadata,
+            "image_url": image_url,
+            "thumbnail_url": thumbnail_url,
+        }
+    
+    processed = [item for item in await asyncio.gather(*(process(i) for i in range(len(images)))) if item]
+    
+    if processed:
+        try:
+            paintings = PaintingService.create_paintings(db, [values for _, values in processed], artist_id)
+        except Exception as e:
+            # Clean up uploaded files if the bulk insert fails
+            for _, values in processed:
+                delete_image_files(values["image_url"], values["thumbnail_url"])
+            raise e
+        
+        for (index, values), painting in zip(processed, paintings):
+            results[index].painting = PaintingResponse.model_validate(painting)
+            schedule_post_upload_jobs(painting, values)
+    
+    return BatchUploadResponse(
+        items=results,
+        created=len(processed),
+        failed=len(results) - len(processed)
+    )
+
+def _listing_response(request: Request, cache_key: str, body: bytes, cache_status: str) -> Response:
+    # The body is already serialized, so its hash is a free validator
+    etag = make_etag(body)
+    headers = {**validator_headers(etag), "x-cache": cache_status, "vary": "Accept-Encoding"}
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    # Compressed variants are cached next to the body, so hits are not recompressed
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding and len(body) >= settings.compression_min_size:
+        variant_key = f"{cache_key}:{etag}:{encoding}"
+        compressed = response_cache.get(variant_key)
+        if compressed is None:
+            compressed = compress(body, encoding, level=PRECOMPRESSED_LEVELS[encoding])
+            response_cache.set(variant_key, compressed, settings.response_cache_ttl)
+        headers["content-encoding"] = encoding
+        return json_bytes_response(compressed, headers=headers)
+    return json_bytes_response(body, headers=headers)
+
 @router.get("/", response_model=PaginatedResponse[PaintingResponse])
 def get_paintings(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
     category_id: Optional[int] = Query(None),
@@ -67,9 +237,29 @@ def get_paintings(
     tags: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
     sort_by: Optional[SortOptions] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,thumbnail_url,artist.username"),
+    include: Optional[str] = Query(None, description="Relations to embed in full: artist, category"),
+    normalize: bool = Query(False, description="Reference artist/category by id and side-load them once in `included`"),
+    viewer_id: Optional[int] = Query(None, description="Annotate each painting with this user's own rating"),
     db: Session = Depends(get_db)
 ):
     """Get paintings with filtering and pagination."""
+    fieldset = parse_painting_fields(fields, include)
+    if normalize or viewer_id:
+        fieldset = full_fieldset(fieldset)
+    
+    # Anonymous listings are the same for every visitor, so they are served from the cache
+    cache_key = listing_cache_key("paintings", {
+        "page": page, "limit": limit, "category_id": category_id, "min_price": min_price,
+        "max_price": max_price, "year_created": year_created, "artist_id": artist_id,
+        "min_rating": min_rating, "tags": tags, "search": search, "sort_by": sort_by,
+        "fields": fieldset.key if fieldset else None, "normalize": normalize or None,
+    })
+    if not viewer_id:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return _listing_response(request, cache_key, cached, "HIT")
+    
     filters = PaintingFilters(
         category_id=category_id,
         min_price=min_price,
@@ -82,45 +272,91 @@ def get_paintings(
     )
     
     skip = (page - 1) * limit
-    paintings, total = PaintingService.get_paintings(db, skip, limit, filters, sort_by)
-    
-    # Convert paintings to response objects
-    painting_responses = [PaintingResponse.model_validate(painting) for painting in paintings]
-    
-    return PaginatedResponse[PaintingResponse](
-        items=painting_responses,
-        total=total,
-        page=page,
-        limit=limit,
-        pages=(total + limit - 1) // limit
-    )
+    if fieldset:
+        paintings, total = PaintingService.get_paintings(
+            db, skip, limit, filters, sort_by, options=painting_load_options(fieldset, normalize)
+        )
+        if viewer_id:
+            # Per-viewer pages are never shared through the cache
+            viewer_ratings = RatingService.get_user_ratings(db, viewer_id, [painting.id for painting in paintings])
+            body = serialize_painting_page(paintings, fieldset, total, page, limit, normalize, viewer_ratings)
+            return json_bytes_response(body, headers={"cache-control": "private, no-cache"})
+        body = serialize_painting_page(paintings, fieldset, total, page, limit, normalize)
+    else:
+        paintings, total = PaintingService.get_paintings(db, skip, limit, filters, sort_by)
+        body = serialize_page(PaintingResponse, paintings, total, page, limit)
+    response_cache.set(cache_key, body, settings.response_cache_ttl)
+    return _listing_response(request, cache_key, body, "MISS")
 
 @router.get("/my-paintings/{artist_id}", response_model=PaginatedResponse[PaintingResponse])
 def get_artist_paintings(
     artist_id: int,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    include: Optional[str] = Query(None, description="Relations to embed in full: artist, category"),
+    normalize: bool = Query(False, description="Reference artist/category by id and side-load them once in `included`"),
+    viewer_id: Optional[int] = Query(None, description="Annotate each painting with this user's own rating"),
     db: Session = Depends(get_db)
 ):
     """Get paintings by specific artist."""
+    fieldset = parse_painting_fields(fields, include)
+    if normalize or viewer_id:
+        fieldset = full_fieldset(fieldset)
     skip = (page - 1) * limit
     filters = PaintingFilters(artist_id=artist_id)
+    if fieldset:
+        paintings, total = PaintingService.get_paintings(
+            db, skip, limit, filters, options=painting_load_options(fieldset, normalize)
+        )
+        viewer_ratings = (
+            RatingService.get_user_ratings(db, viewer_id, [painting.id for painting in paintings])
+            if viewer_id else None
+        )
+        return json_bytes_response(serialize_painting_page(
+            paintings, fieldset, total, page, limit, normalize, viewer_ratings
+        ))
     paintings, total = PaintingService.get_paintings(db, skip, limit, filters)
     
-    # Convert paintings to response objects
-    painting_responses = [PaintingResponse.model_validate(painting) for painting in paintings]
+    return json_bytes_response(serialize_page(PaintingResponse, paintings, total, page, limit))
+
+@router.get("/batch", response_model=PaintingBatchResponse)
+def get_paintings_batch(
+    ids: str = Query(..., description="Comma-separated painting ids, e.g. 12,5,40"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get several paintings by id with one query, in the requested order.
+    Unknown ids are listed in `missing`. Unlike GET /paintings/{id}, this
+    does not count as a view.
+    """
+    painting_ids = parse_id_list(ids, settings.batch_get_max_ids)
+    found = {painting.id: painting for painting in PaintingService.get_paintings_by_ids(db, painting_ids)}
     
-    return PaginatedResponse[PaintingResponse](
-        items=painting_responses,
-        total=total,
-        page=page,
-        limit=limit,
-        pages=(total + limit - 1) // limit
+    batch = PaintingBatchResponse.model_validate(
+        {
+            "items": [found[painting_id] for painting_id in painting_ids if painting_id in found],
+            "missing": [painting_id for painting_id in painting_ids if painting_id not in found],
+        },
+        from_attributes=True
     )
+    return json_bytes_response(batch.model_dump_json().encode())
 
 @router.get("/{painting_id}", response_model=PaintingResponse)
-def get_painting(painting_id: int, db: Session = Depends(get_db)):
-    """Get painting by ID and increment view count."""
+def get_painting(
+    painting_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    include: Optional[str] = Query(None, description="Relations to embed in full: artist, category"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get painting by ID and increment view count.
+    Supports If-None-Match / If-Modified-Since; the view count is not part of
+    the validator, so polling clients get 304 until the painting itself changes.
+    """
+    fieldset = parse_painting_fields(fields, include)
     painting = PaintingService.get_painting(db, painting_id)
     if not painting:
         raise HTTPException(
@@ -128,10 +364,154 @@ def get_painting(painting_id: int, db: Session = Depends(get_db)):
             detail="Painting not found"
         )
     
+    last_modified = painting.updated_at or painting.created_at
+    etag = make_etag(
+        painting.id, last_modified, painting.category_id,
+        painting.artist.updated_at or painting.artist.created_at,
+        fieldset.key if fieldset else None
+    )
+    not_modified = conditional_response(request, response, etag, last_modified)
+    if not_modified:
+        PaintingService.increment_view_count(db, painting_id)
+        return not_modified
+    
+    # Serialize before the commit below expires the (possibly cached) instance,
+    # which would cost a reload
+    if fieldset:
+        # The painting comes from the entity cache, so only the output is narrowed
+        data = serialize_painting(painting, fieldset)
+        PaintingService.increment_view_count(db, painting_id)
+        if "view_count" in data:
+            data["view_count"] += 1
+        return ORJSONResponse(data, headers=dict(response.headers))
+    painting_response = PaintingResponse.model_validate(painting)
+    
     # Increment view count
     PaintingService.increment_view_count(db, painting_id)
+    painting_response.view_count += 1
+    
+    return painting_response
+
+def _in_session(read, *args):
+    """Run read(db, *args) with a session of its own, so reads can run in parallel threads."""
+    db = SessionLocal()
+    try:
+        return read(db, *args)
+    finally:
+        db.close()
+
+# The readers serialize inside their session; lazy loads can't run once it is closed
+def _read_painting(db: Session, painting_id: int) -> Optional[PaintingResponse]:
+    painting = PaintingService.get_painting(db, painting_id)
+    return PaintingResponse.model_validate(painting) if painting else None
+
+def _read_comments(db: Session, painting_id: int, limit: int) -> List[CommentResponse]:
+    comments = CommentService.get_painting_comments(db, painting_id, 0, limit)
+    return [CommentResponse.model_validate(comment) for comment in comments]
+
+def _read_viewer_rating(db: Session, viewer_id: int, painting_id: int) -> Optional[int]:
+    rating = RatingService.get_user_rating(db, viewer_id, painting_id)
+    return rating.rating if rating else None
+
+def _read_related(db: Session, painting: PaintingResponse, limit: int) -> List[PaintingListResponse]:
+    related = PaintingService.get_related_paintings(
+        db, painting.id, painting.artist_id, painting.category_id, limit
+    )
+    return [PaintingListResponse.model_validate(item) for item in related]
+
+async def _no_viewer() -> None:
+    return None
+
+@router.get("/{painting_id}/detail", response_model=PaintingDetailResponse)
+async def get_painting_detail(
+    painting_id: int,
+    viewer_id: Optional[int] = Query(None, description="User whose own rating is returned"),
+    comment_limit: int = Query(20, ge=1, le=50),
+    related_limit: int = Query(8, ge=0, le=24),
+):
+    """
+    Everything a painting page needs in one request: the painting, the first
+    page of comments, the viewer's rating and related works. The painting is
+    looked up once; the other reads and the view count update then run
+    concurrently, each in a thread with its own session.
+    """
+    painting = await run_in_threadpool(_in_session, _read_painting, painting_id)
+    if not painting:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Painting not found"
+        )
+    
+    comments, viewer_rating, related, _ = await asyncio.gather(
+        run_in_threadpool(_in_session, _read_comments, painting_id, comment_limit),
+        run_in_threadpool(_in_session, _read_viewer_rating, viewer_id, painting_id) if viewer_id else _no_viewer(),
+        run_in_threadpool(_in_session, _read_related, painting, related_limit),
+        run_in_threadpool(_in_session, PaintingService.increment_view_count, painting_id),
+    )
+    painting.view_count += 1
+    
+    detail = PaintingDetailResponse(
+        painting=painting, comments=comments, viewer_rating=viewer_rating, related=related
+    )
+    return json_bytes_response(detail.model_dump_json().encode())
+
+@router.get("/sprites/{block}", response_model=SpriteSheetResponse)
+def get_painting_sprite_sheet(
+    block: int,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    Thumbnails of a catalog block (painting ids `block * SPRITE_BLOCK_SIZE` up to the
+    next block) packed into one image, with the offset of each painting in it.
+    A gallery page fetches the sheets of the blocks its paintings fall in
+    instead of one thumbnail per painting.
+    """
+    sheet = get_sprite_sheet(db, block) if block >= 0 else None
+    if not sheet:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No paintings in this block"
+        )
+    
+    sheet["sprite_url"] = f"http://localhost:8000/paintings/sprites/{block}/{sheet['version']}.jpg"
+    # The map changes whenever a painting of the block does; the image URL is versioned
+    response.headers["cache-control"] = "public, max-age=60"
+    return sheet
+
+@router.get("/sprites/{block}/{version}.jpg")
+def get_painting_sprite_image(block: int, version: str, request: Request):
+    """Serve a rendered sprite sheet; versions never change, so it is cached forever."""
+    relative_path = os.path.relpath(os.path.join(sprite_directory(block), f"{version}.jpg"), settings.upload_dir)
+    response = media_response(request, relative_path)
+    response.headers["cache-control"] = "public, max-age=31536000, immutable"
+    return response
+
+@router.get("/{painting_id}/tiles/{tile_path:path}")
+def get_painting_tile(
+    painting_id: int,
+    tile_path: str,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Serve the deep zoom pyramid of a painting: `image.dzi` for the descriptor,
+    `{level}/{col}_{row}.jpg` for tiles. Responses are immutable and cacheable.
+    """
+    painting = db.query(Painting.image_url, Painting.tiles_ready).filter(
+        Painting.id == painting_id
+    ).first()
+    if not painting or not painting.tiles_ready:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tiles not available for this painting"
+        )
     
-    return painting
+    tiles_root = os.path.relpath(tile_directory(painting.image_url), settings.upload_dir)
+    response = media_response(request, os.path.join(tiles_root, tile_path))
+    # Tile names are derived from an immutable original, so they never change
+    response.headers["cache-control"] = "public, max-age=31536000, immutable"
+    return response
 
 @router.put("/{painting_id}", response_model=PaintingResponse)
 def update_painting(
@@ -171,6 +551,7 @@ def delete_painting(
     if success:
         # Clean up image files
         delete_image_files(painting.image_url, painting.thumbnail_url)
+        shutil.rmtree(tile_directory(painting.image_url), ignore_errors=True)
     else:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
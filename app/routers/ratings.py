@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional, Union
 from app.database import get_db
-from app.schemas import RatingCreate, RatingResponse
+from app.schemas import RatingCreate, RatingResponse, RatingSummary, CursorPage
 from app.crud import RatingService, PaintingService
+from app.responses import json_bytes_response, encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/ratings", tags=["Ratings"])
 
@@ -46,12 +47,15 @@ def get_user_rating(
         )
     return rating
 
-@router.get("/painting/{painting_id}", response_model=List[RatingResponse])
+@router.get("/painting/{painting_id}", response_model=Union[CursorPage[RatingResponse], RatingSummary])
 def get_painting_ratings(
     painting_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    aggregate: bool = Query(False, description="Only the average and the 1-5 star histogram, no individual ratings"),
     db: Session = Depends(get_db)
 ):
-    """Get all ratings for a specific painting."""
+    """Get a painting's ratings, newest first, one cursor page at a time."""
     painting = PaintingService.get_painting(db, painting_id)
     if not painting:
         raise HTTPException(
@@ -59,7 +63,29 @@ def get_painting_ratings(
             detail="Painting not found"
         )
     
-    return RatingService.get_painting_ratings(db, painting_id)
+    if aggregate:
+        return RatingSummary(
+            painting_id=painting_id,
+            average_rating=painting.average_rating,
+            rating_count=painting.rating_count,
+            histogram=painting.rating_histogram
+        )
+    
+    before_id = None
+    if cursor:
+        try:
+            before_id = int(decode_cursor(cursor))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    ratings = RatingService.get_painting_ratings(db, painting_id, limit, before_id)
+    next_cursor = encode_cursor(str(ratings[limit - 1].id)) if len(ratings) > limit else None
+    page = CursorPage[RatingResponse].model_validate(
+        {"items": ratings[:limit], "next_cursor": next_cursor}, from_attributes=True
+    )
+    return json_bytes_response(page.model_dump_json().encode())
 
 @router.get("/user/{user_id}/painting/{painting_id}")
 def get_user_rating_for_painting(
@@ -71,4 +97,4 @@ def get_user_rating_for_painting(
     rating = RatingService.get_user_rating(db, user_id, painting_id)
     if not rating:
         return {"rating": None}
-    return {"rating": rating.score}
+    return {"rating": rating.rating}
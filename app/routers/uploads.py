@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Header, Request, Response, status
+from typing import Optional
+from app.resumable import (
+    TUS_VERSION, parse_upload_length, parse_upload_metadata, create_upload, get_upload,
+    append_chunk, discard_upload
+)
+
+router = APIRouter(prefix="/resumable-uploads", tags=["Uploads"])
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+def create_resumable_upload(
+    upload_length: str = Header(..., description="Total size of the file in bytes"),
+    upload_metadata: Optional[str] = Header(None, description="tus metadata, e.g. 'filename base64(name)'; the filename needs an allowed image extension")
+):
+    """
+    Start a resumable upload (tus-style). Send the bytes with PATCH, query the
+    offset with HEAD after a dropped connection, then create the painting with
+    `POST /paintings/` passing `upload_id` instead of `image`.
+    """
+    # Both headers are validated before anything is staged
+    length = parse_upload_length(upload_length)
+    metadata = parse_upload_metadata(upload_metadata)
+    upload_id = create_upload(length, metadata.get("filename", "upload"))
+    return Response(
+        status_code=status.HTTP_201_CREATED,
+        headers={
+            "Location": f"/resumable-uploads/{upload_id}",
+            "Tus-Resumable": TUS_VERSION,
+            "Upload-Offset": "0",
+        }
+    )
+
+@router.head("/{upload_id}")
+def get_resumable_upload_offset(upload_id: str):
+    """Return the number of bytes received so far."""
+    info = get_upload(upload_id)
+    return Response(
+        headers={
+            "Upload-Offset": str(info["offset"]),
+            "Upload-Length": str(info["length"]),
+            "Tus-Resumable": TUS_VERSION,
+            "Cache-Control": "no-store",
+        }
+    )
+
+@router.patch("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., description="Offset the chunk starts at")
+):
+    """Append a chunk (Content-Type: application/offset+octet-stream)."""
+    offset = await append_chunk(upload_id, upload_offset, request.stream())
+    return Response(
+        status_code=status.HTTP_204_NO_CONTENT,
+        headers={"Upload-Offset": str(offset), "Tus-Resumable": TUS_VERSION}
+    )
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+def cancel_resumable_upload(upload_id: str):
+    """Abort an upload and discard its staged data."""
+    get_upload(upload_id)
+    discard_upload(upload_id)
@@ -1,25 +1,109 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from app.database import get_db
-from app.schemas import UserResponse, UserUpdate, PaginationParams, PaginatedResponse
-from app.crud import UserService, PaintingService
+from app.schemas import (
+    UserResponse, UserUpdate, UserBatchResponse, UserRole, ArtistDirectoryEntry,
+    PaginationParams, PaginatedResponse, CursorPage, PaintingResponse
+)
+from app.crud import UserService, PaintingService, RatingService
 from app.models import User
+from app.utils import parse_id_list
+from app.config import settings
+from app.cache import response_cache, listing_cache_key
+from app.conditional import make_etag, conditional_response
+from fastapi.responses import ORJSONResponse
+from app.responses import serialize_page, json_bytes_response, encode_cursor, decode_cursor
+from app.fieldsets import (
+    parse_painting_fields, parse_user_fields, full_fieldset, painting_load_options,
+    user_load_options, serialize_painting_page, serialize_user, DIRECTORY_FIELDS
+)
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-@router.get("/", response_model=List[UserResponse])
+def _users_page(
+    db: Session,
+    limit: int,
+    role: Optional[str],
+    q: Optional[str],
+    cursor: Optional[str],
+    columns: Optional[List[str]] = None
+) -> Tuple[List[User], Optional[str]]:
+    # The cursor is the last username of the previous page, so username is always loaded
+    options = user_load_options(columns + ["username"]) if columns else None
+    users = UserService.get_users_page(
+        db, limit, role=role, username_prefix=q,
+        after_username=decode_cursor(cursor) if cursor else None, options=options
+    )
+    next_cursor = encode_cursor(users[limit - 1].username) if len(users) > limit else None
+    return users[:limit], next_cursor
+
+@router.get("/", response_model=CursorPage[UserResponse])
 def get_all_users(
-    role: Optional[str] = Query(None, description="Filter by user role (artist, enthusiast)"),
+    role: Optional[UserRole] = Query(None, description="Filter by user role (artist, enthusiast)"),
+    q: Optional[str] = Query(None, min_length=1, description="Username prefix"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,username"),
+    db: Session = Depends(get_db)
+):
+    """Get users ordered by username, optionally filtered by role and username prefix."""
+    columns = parse_user_fields(fields)
+    users, next_cursor = _users_page(db, limit, role.value if role else None, q, cursor, columns)
+    if columns:
+        return ORJSONResponse({"items": [serialize_user(user, columns) for user in users], "next_cursor": next_cursor})
+    page = CursorPage[UserResponse].model_validate(
+        {"items": users, "next_cursor": next_cursor}, from_attributes=True
+    )
+    return json_bytes_response(page.model_dump_json().encode())
+
+@router.get("/artists", response_model=CursorPage[ArtistDirectoryEntry])
+def get_artists(
+    q: Optional[str] = Query(None, min_length=1, description="Username prefix"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,username,painting_count"),
     db: Session = Depends(get_db)
 ):
-    """Get all users, optionally filtered by role."""
-    return UserService.get_all_users(db, role=role)
+    """
+    Artist directory ordered by username, with each artist's painting count and
+    average rating. Pages are cached until an artist or painting changes.
+    """
+    columns = parse_user_fields(fields, DIRECTORY_FIELDS)
+    cache_key = listing_cache_key("artists", {
+        "q": q, "cursor": cursor, "limit": limit, "fields": ",".join(columns) if columns else None
+    })
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return json_bytes_response(cached, headers={"x-cache": "HIT"})
+    
+    users, next_cursor = _users_page(db, limit, "artist", q, cursor)
+    stats = UserService.get_artist_stats(db, [user.id for user in users])
+    items = [
+        ArtistDirectoryEntry.model_validate({
+            **UserResponse.model_validate(user).model_dump(),
+            "painting_count": stats.get(user.id, (0, 0.0))[0],
+            "average_rating": stats.get(user.id, (0, 0.0))[1],
+        }).model_dump(mode="json", include=set(columns) if columns else None)
+        for user in users
+    ]
+    body = orjson.dumps({"items": items, "next_cursor": next_cursor})
+    response_cache.set(cache_key, body, settings.response_cache_ttl)
+    return json_bytes_response(body, headers={"x-cache": "MISS"})
 
-@router.get("/artists", response_model=List[UserResponse])
-def get_artists(db: Session = Depends(get_db)):
-    """Get all users with artist role."""
-    return UserService.get_all_users(db, role="artist")
+@router.get("/batch", response_model=UserBatchResponse)
+def get_users_batch(
+    ids: str = Query(..., description="Comma-separated user ids, e.g. 7,3,9"),
+    db: Session = Depends(get_db)
+):
+    """Get several users by id with one query, in the requested order; unknown ids are listed in `missing`."""
+    user_ids = parse_id_list(ids, settings.batch_get_max_ids)
+    found = {user.id: user for user in UserService.get_users_by_ids(db, user_ids)}
+    return {
+        "items": [found[user_id] for user_id in user_ids if user_id in found],
+        "missing": [user_id for user_id in user_ids if user_id not in found],
+    }
 
 @router.get("/me/{user_id}", response_model=UserResponse)
 def get_user_profile(user_id: int, db: Session = Depends(get_db)):
@@ -48,24 +132,45 @@ def update_user_profile(
     return updated_user
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user_profile(user_id: int, db: Session = Depends(get_db)):
-    """Get user profile by ID."""
+def get_user_profile(
+    user_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,username"),
+    db: Session = Depends(get_db)
+):
+    """Get user profile by ID (supports If-None-Match / If-Modified-Since)."""
+    columns = parse_user_fields(fields)
     user = UserService.get_user(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    last_modified = user.updated_at or user.created_at
+    etag = make_etag(user.id, last_modified, ",".join(columns) if columns else None)
+    not_modified = conditional_response(request, response, etag, last_modified)
+    if not_modified:
+        return not_modified
+    if columns:
+        return ORJSONResponse(serialize_user(user, columns), headers=dict(response.headers))
     return user
 
-@router.get("/{user_id}/paintings")
+@router.get("/{user_id}/paintings", response_model=PaginatedResponse[PaintingResponse])
 def get_user_paintings(
     user_id: int,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated painting fields to return"),
+    include: Optional[str] = Query(None, description="Relations to embed in full: artist, category"),
+    normalize: bool = Query(False, description="Reference artist/category by id and side-load them once in `included`"),
+    viewer_id: Optional[int] = Query(None, description="Annotate each painting with this user's own rating"),
     db: Session = Depends(get_db)
 ):
     """Get paintings by a specific user."""
+    fieldset = parse_painting_fields(fields, include)
+    if normalize or viewer_id:
+        fieldset = full_fieldset(fieldset)
     # Check if user exists
     user = UserService.get_user(db, user_id)
     if not user:
@@ -75,14 +180,19 @@ def get_user_paintings(
         )
     
     skip = (page - 1) * limit
+    if fieldset:
+        paintings, total = PaintingService.get_user_paintings(
+            db, user_id, skip, limit, options=painting_load_options(fieldset, normalize)
+        )
+        viewer_ratings = (
+            RatingService.get_user_ratings(db, viewer_id, [painting.id for painting in paintings])
+            if viewer_id else None
+        )
+        return json_bytes_response(serialize_painting_page(
+            paintings, fieldset, total, page, limit, normalize, viewer_ratings
+        ))
     paintings, total = PaintingService.get_user_paintings(db, user_id, skip, limit)
     
-    return PaginatedResponse(
-        items=paintings,
-        total=total,
-        page=page,
-        limit=limit,
-        pages=(total + limit - 1) // limit
-    )
+    return json_bytes_response(serialize_page(PaintingResponse, paintings, total, page, limit))
 
 
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, validator, field_validator
-from typing import Optional, List, Generic, TypeVar
+from pydantic import BaseModel, ConfigDict, EmailStr, field_validator
+from typing import Optional, List, Dict, Generic, TypeVar
 from datetime import datetime
 from enum import Enum
 
@@ -16,6 +16,12 @@ class PaintingStatus(str, Enum):
     PUBLISHED = "published"
     ARCHIVED = "archived"
 
+def absolute_media_url(url: Optional[str]) -> Optional[str]:
+    """Media URLs are stored relative to the server; clients get absolute ones."""
+    if url and url.startswith('/uploads/'):
+        return f"http://localhost:8000{url}"
+    return url
+
 # User Schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -27,7 +33,8 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
     
-    @validator('password')
+    @field_validator('password')
+    @classmethod
     def validate_password(cls, v):
         if len(v) < 8:
             raise ValueError('Password must be at least 8 characters long')
@@ -47,8 +54,15 @@ class UserResponse(UserBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+class ArtistDirectoryEntry(UserResponse):
+    painting_count: int = 0
+    average_rating: float = 0.0  # Over all of the artist's ratings
+
+class UserBatchResponse(BaseModel):
+    items: List[UserResponse]
+    missing: List[int]
 
 class UserLogin(BaseModel):
     username: str
@@ -74,8 +88,7 @@ class CategoryResponse(CategoryBase):
     id: int
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Painting Schemas
 class PaintingBase(BaseModel):
@@ -107,6 +120,11 @@ class PaintingResponse(PaintingBase):
     artist_id: int
     image_url: str
     thumbnail_url: Optional[str] = None
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    dominant_color: Optional[str] = None
+    blurhash: Optional[str] = None
+    tiles_ready: bool = False
     status: PaintingStatus
     view_count: int = 0
     average_rating: float = 0.0
@@ -122,12 +140,9 @@ class PaintingResponse(PaintingBase):
     @classmethod
     def make_absolute_url(cls, v):
         """Convert relative URLs to absolute URLs for frontend consumption."""
-        if v and v.startswith('/uploads/'):
-            return f"http://localhost:8000{v}"
-        return v
+        return absolute_media_url(v)
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PaintingListResponse(BaseModel):
     id: int
@@ -135,28 +150,60 @@ class PaintingListResponse(BaseModel):
     artist_id: int
     image_url: str
     thumbnail_url: Optional[str] = None
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    dominant_color: Optional[str] = None
+    blurhash: Optional[str] = None
     average_rating: float = 0.0
     
     @field_validator('image_url', 'thumbnail_url', mode='before')
     @classmethod
     def make_absolute_url(cls, v):
         """Convert relative URLs to absolute URLs for frontend consumption."""
-        if v and v.startswith('/uploads/'):
-            return f"http://localhost:8000{v}"
-        return v
+        return absolute_media_url(v)
     rating_count: int = 0
     price: Optional[float] = None
     artist: UserResponse
     category: Optional[CategoryResponse] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+class BatchUploadItemResult(BaseModel):
+    index: int
+    filename: Optional[str] = None
+    painting: Optional[PaintingResponse] = None
+    error: Optional[str] = None
+
+class BatchUploadResponse(BaseModel):
+    items: List[BatchUploadItemResult]
+    created: int
+    failed: int
+
+class PaintingBatchResponse(BaseModel):
+    items: List[PaintingResponse]
+    missing: List[int]
+
+class SpriteItem(BaseModel):
+    painting_id: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+class SpriteSheetResponse(BaseModel):
+    block: int
+    version: str
+    sprite_url: str
+    width: int
+    height: int
+    items: List[SpriteItem]
 
 # Rating Schemas
 class RatingBase(BaseModel):
     rating: int
     
-    @validator('rating')
+    @field_validator('rating')
+    @classmethod
     def validate_rating(cls, v):
         if v < 1 or v > 5:
             raise ValueError('Rating must be between 1 and 5')
@@ -173,8 +220,13 @@ class RatingResponse(RatingBase):
     updated_at: Optional[datetime] = None
     user: UserResponse
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+class RatingSummary(BaseModel):
+    painting_id: int
+    average_rating: float
+    rating_count: int
+    histogram: Dict[int, int]  # Stars (1-5) -> number of ratings
 
 # Comment Schemas
 class CommentBase(BaseModel):
@@ -197,24 +249,32 @@ class CommentResponse(CommentBase):
     user: UserResponse
     replies: Optional[List['CommentResponse']] = []
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Update forward reference
 CommentResponse.model_rebuild()
 
+# Composite painting page
+class PaintingDetailResponse(BaseModel):
+    painting: PaintingResponse
+    comments: List[CommentResponse]
+    viewer_rating: Optional[int] = None
+    related: List[PaintingListResponse]
+
 # Pagination Schema
 class PaginationParams(BaseModel):
     page: int = 1
     limit: int = 10
     
-    @validator('page')
+    @field_validator('page')
+    @classmethod
     def validate_page(cls, v):
         if v < 1:
             raise ValueError('Page must be at least 1')
         return v
     
-    @validator('limit')
+    @field_validator('limit')
+    @classmethod
     def validate_limit(cls, v):
         if v < 1 or v > 100:
             raise ValueError('Limit must be between 1 and 100')
@@ -227,6 +287,10 @@ class PaginatedResponse(BaseModel, Generic[T]):
     limit: int
     pages: int
 
+class CursorPage(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None  # Pass as `cursor` for the next page; None on the last page
+
 # Search and Filter Schemas
 class PaintingFilters(BaseModel):
     category_id: Optional[int] = None
@@ -245,6 +309,7 @@ class SortOptions(str, Enum):
     PRICE_HIGH = "price_high"
     RATING_HIGH = "rating_high"
     RATING_LOW = "rating_low"
+    BEST_RATED = "best_rated"  # Bayesian average: many good ratings beat a single perfect one
     MOST_VIEWED = "most_viewed"
     TITLE_AZ = "title_az"
     TITLE_ZA = "title_za"
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from typing import Callable, Optional
+from PIL import Image
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Painting
+from app.utils import media_url_to_path
+
+# Temp files older than this belong to a render that died; newer ones may be in progress
+TEMP_FILE_MAX_AGE = 3600
+
+def sprite_directory(block: int) -> str:
+    return os.path.join(settings.upload_dir, "sprites", str(block))
+
+def _write_atomically(path: str, write: Callable[[str], None]) -> None:
+    """
+    Write a file through a uniquely named temp file in the same directory and
+    rename it into place, so concurrent renders of a block never share a temp
+    file and readers only ever see complete files.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    os.close(fd)
+    os.chmod(temp_path, 0o644)  # mkstemp creates 0600; the sheet is served like any upload
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _block_members(db: Session, block: int) -> list:
+    """Paintings of a catalog block with the files their thumbnails are read from."""
+    size = settings.sprite_block_size
+    rows = db.query(Painting.id, Painting.thumbnail_url).filter(
+        Painting.id >= block * size,
+        Painting.id < (block + 1) * size,
+        Painting.thumbnail_url.isnot(None)
+    ).order_by(Painting.id).all()
+
+    members = []
+    for row in rows:
+        path = media_url_to_path(row.thumbnail_url)
+        if path and os.path.exists(path):
+            members.append((row.id, path, os.stat(path)))
+    return members
+
+def _block_version(members: list) -> str:
+    # The sprite only shows thumbnails, so it changes exactly when one of them does
+    digest = hashlib.sha1(settings.thumbnail_size.to_bytes(4, "big"))
+    for painting_id, path, stat_result in members:
+        digest.update(f"{painting_id}:{path}:{stat_result.st_size}:{stat_result.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+def _render_sprite(members: list, sprite_path: str) -> dict:
+    """Pack the thumbnails into a grid of thumbnail_size cells and return the offset map."""
+    cell = settings.thumbnail_size
+    columns = min(settings.sprite_columns, len(members))
+    rows = -(-len(members) // columns)
+    sprite = Image.new("RGB", (columns * cell, rows * cell), (255, 255, 255))
+
+    items = []
+    for index, (painting_id, path, _) in enumerate(members):
+        x, y = (index % columns) * cell, (index // columns) * cell
+        with Image.open(path) as thumb:
+            thumb = thumb.convert("RGB")
+            thumb.thumbnail((cell, cell))
+            sprite.paste(thumb, (x, y))
+            items.append({"painting_id": painting_id, "x": x, "y": y, "width": thumb.width, "height": thumb.height})
+
+    _write_atomically(sprite_path, lambda temp_path: sprite.save(
+        temp_path, "JPEG", quality=settings.thumbnail_quality, optimize=True, progressive=True
+    ))
+    return {"width": sprite.width, "height": sprite.height, "items": items}
+
+def get_sprite_sheet(db: Session, block: int) -> Optional[dict]:
+    """
+    Return the sprite sheet of a catalog block (paintings with ids in
+    [block * SPRITE_BLOCK_SIZE, (block + 1) * SPRITE_BLOCK_SIZE)), rendering it
+    on first use. Sheets are versioned by their thumbnails' content, so a
+    changed, added or deleted painting produces a new version; older versions
+    of the block are removed when it is rendered.
+    """
+    members = _block_members(db, block)
+    if not members:
+        return None
+
+    version = _block_version(members)
+    directory = sprite_directory(block)
+    sprite_path = os.path.join(directory, f"{version}.jpg")
+    map_path = os.path.join(directory, f"{version}.json")
+
+    if os.path.exists(map_path) and os.path.exists(sprite_path):
+        with open(map_path) as f:
+            sheet = json.load(f)
+    else:
+        os.makedirs(directory, exist_ok=True)
+        sheet = _render_sprite(members, sprite_path)
+
+        def write_map(temp_path: str) -> None:
+            with open(temp_path, "w") as f:
+                json.dump(sheet, f)
+        _write_atomically(map_path, write_map)
+
+        # Drop older versions; temp files may be another request's render in progress
+        stale_before = time.time() - TEMP_FILE_MAX_AGE
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if name.startswith(version):
+                    continue
+                if name.endswith(".tmp") and os.path.getmtime(path) >= stale_before:
+                    continue
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    return {"block": block, "version": version, **sheet}
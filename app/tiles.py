@@ -0,0 +1,210 @@
+import os
+import math
+import mimetypes
+import shutil
+import posixpath
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from PIL import Image
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Painting
+from app.utils import media_url_to_path, shard_path
+from app.cache import bump_catalog_version, invalidate_entity
+
+mimetypes.add_type("application/xml", ".dzi")
+
+DZI_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+    'TileSize="{tile_size}" Overlap="0" Format="jpg">'
+    '<Size Width="{width}" Height="{height}"/></Image>\n'
+)
+
+def tile_directory(image_url: str) -> str:
+    """Directory holding the tile pyramid of an original (uploads/tiles/ab/cd/<stem>)."""
+    stem = posixpath.splitext(posixpath.basename(image_url))[0]
+    return os.path.join(settings.upload_dir, "tiles", *shard_path(stem).split("/"))
+
+# EXIF orientation -> transpose that makes the image upright (as ImageOps.exif_transpose)
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+def _source_box(orientation: int, size: tuple, top: int, bottom: int) -> tuple:
+    """Region of the stored image that becomes rows top..bottom of the upright image."""
+    width, height = size
+    if orientation in (1, 2):
+        return (0, top, width, bottom)
+    if orientation in (3, 4):
+        return (0, height - bottom, width, height - top)
+    if orientation in (5, 6):
+        return (top, 0, bottom, height)
+    return (width - bottom, 0, width - top, height)  # 7, 8
+
+class _LevelWriter:
+    """
+    Cuts one pyramid level into tiles from horizontal strips.
+
+    Rows are buffered until a full row of tiles is available; each finished tile
+    row is downscaled by two and handed to the next (smaller) level. Memory per
+    level is therefore one tile row, never the whole level. The downscale is a
+    2x2 box average, which only reads the pixels it replaces, so tile rows
+    scaled separately join without seams at the next level.
+    """
+
+    def __init__(self, level: int, output_dir: str, tile_size: int, child: Optional["_LevelWriter"]):
+        self.level = level
+        self.output_dir = os.path.join(output_dir, str(level))
+        self.tile_size = tile_size
+        self.child = child
+        self.buffer: Optional[Image.Image] = None
+        self.row = 0
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def add(self, strip: Image.Image) -> None:
+        if self.buffer is None:
+            self.buffer = strip
+        else:
+            merged = Image.new("RGB", (self.buffer.width, self.buffer.height + strip.height))
+            merged.paste(self.buffer, (0, 0))
+            merged.paste(strip, (0, self.buffer.height))
+            self.buffer = merged
+
+        while self.buffer is not None and self.buffer.height >= self.tile_size:
+            tile_row = self.buffer.crop((0, 0, self.buffer.width, self.tile_size))
+            rest = self.buffer.height - self.tile_size
+            self.buffer = self.buffer.crop((0, self.tile_size, self.buffer.width, self.buffer.height)) if rest else None
+            self._emit(tile_row)
+
+    def finish(self) -> None:
+        if self.buffer is not None:
+            self._emit(self.buffer)
+            self.buffer = None
+        if self.child:
+            self.child.finish()
+
+    def _emit(self, tile_row: Image.Image) -> None:
+        for col in range(math.ceil(tile_row.width / self.tile_size)):
+            left = col * self.tile_size
+            tile = tile_row.crop((left, 0, min(left + self.tile_size, tile_row.width), tile_row.height))
+            tile.save(
+                os.path.join(self.output_dir, f"{col}_{self.row}.jpg"),
+                "JPEG",
+                quality=settings.tile_quality
+            )
+        self.row += 1
+
+        if self.child:
+            self.child.add(tile_row.reduce(2))
+
+def generate_tile_pyramid(image_file_path: str, output_dir: str) -> None:
+    """
+    Write a Deep Zoom (DZI) tile pyramid for an image into output_dir.
+    The pyramid is built in a temporary directory and renamed into place, so a
+    descriptor only ever appears for a complete pyramid.
+
+    Pillow decodes the stored original once (about 3 bytes per pixel, up to
+    MAX_IMAGE_PIXELS); strips are rotated upright and converted to RGB one at
+    a time, and levels are built strip by strip, so nothing else scales with
+    the image. Run it through run_tile_job() to keep that decode out of the
+    API process.
+    """
+    tile_size = settings.tile_size
+    temp_dir = f"{output_dir}.partial"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+
+    try:
+        with Image.open(image_file_path) as img:
+            # Tiles are immutable once served, so cut them from the upright image;
+            # its size matches the painting's image_width / image_height
+            orientation = img.getexif().get(0x0112, 1)
+            transpose = ORIENTATION_TRANSPOSE.get(orientation)
+            if transpose is None:
+                orientation = 1
+            swapped = orientation in (5, 6, 7, 8)
+            width, height = (img.height, img.width) if swapped else img.size
+            max_level = math.ceil(math.log2(max(width, height, 1)))
+
+            # Chain of writers from the smallest level (1x1) up to full resolution
+            writer: Optional[_LevelWriter] = None
+            for level in range(max_level + 1):
+                writer = _LevelWriter(level, temp_dir, tile_size, writer)
+
+            for top in range(0, height, tile_size):
+                strip = img.crop(_source_box(orientation, img.size, top, min(top + tile_size, height)))
+                if transpose is not None:
+                    strip = strip.transpose(transpose)
+                if strip.mode != "RGB":
+                    strip = strip.convert("RGB")
+                writer.add(strip)
+            writer.finish()
+
+        with open(os.path.join(temp_dir, "image.dzi"), "w") as f:
+            f.write(DZI_TEMPLATE.format(tile_size=tile_size, width=width, height=height))
+
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+        os.replace(temp_dir, output_dir)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+def needs_tiles(image_metadata: Optional[dict]) -> bool:
+    """Whether an upload is large enough to get a deep zoom pyramid."""
+    if not image_metadata or not image_metadata.get("image_width"):
+        return False
+    return image_metadata["image_width"] * image_metadata["image_height"] >= settings.tile_min_pixels
+
+# Pyramids are cut in a separate process, one at a time: the decoded original
+# never lands in the API process, and concurrent uploads don't add up. The
+# worker is replaced after each job so its memory goes back to the OS.
+_tile_pool: Optional[ProcessPoolExecutor] = None
+_tile_pool_lock = threading.Lock()
+
+def _get_tile_pool() -> ProcessPoolExecutor:
+    global _tile_pool
+    with _tile_pool_lock:
+        if _tile_pool is None:
+            _tile_pool = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=1
+            )
+        return _tile_pool
+
+def run_tile_job(image_file_path: str, output_dir: str) -> None:
+    """Run generate_tile_pyramid in the tile process and wait for it."""
+    global _tile_pool
+    pool = _get_tile_pool()
+    try:
+        pool.submit(generate_tile_pyramid, image_file_path, output_dir).result()
+    except BrokenProcessPool:
+        # The worker died (e.g. killed for memory); start a fresh pool next time
+        with _tile_pool_lock:
+            if _tile_pool is pool:
+                _tile_pool = None
+        raise
+
+def build_painting_tiles(painting_id: int, image_url: str) -> None:
+    """Background job: generate the tile pyramid and flag the painting as zoomable."""
+    run_tile_job(media_url_to_path(image_url), tile_directory(image_url))
+
+    db = SessionLocal()
+    try:
+        db.query(Painting).filter(Painting.id == painting_id).update({Painting.tiles_ready: True})
+        db.commit()
+        bump_catalog_version()
+        invalidate_entity(Painting, painting_id)
+    finally:
+        db.close()
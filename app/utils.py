@@ -1,9 +1,25 @@
 import os
 import uuid
-from typing import Optional
-from PIL import Image
+import struct
+import hashlib
+import posixpath
+from typing import List, Optional
+from PIL import Image, ImageOps
 from fastapi import UploadFile, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from app.config import settings
+from app.blurhash import encode_blurhash
+
+THUMBNAIL_EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp", "PNG": "png"}
+
+# Bytes read before anything else is done with an upload; enough for the
+# header of almost every file (JPEG dimensions can follow a 64KB EXIF block)
+IMAGE_HEADER_BYTES = 80 * 1024
+
+EXTENSION_FORMATS = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG", "webp": "WEBP", "gif": "GIF"}
+
+# Pillow refuses to decode anything much larger than this, including in CLI tools
+Image.MAX_IMAGE_PIXELS = settings.max_image_pixels
 
 def validate_image(file: UploadFile) -> None:
     """Validate uploaded image file."""
@@ -14,79 +30,274 @@ def validate_image(file: UploadFile) -> None:
             detail=f"File size too large. Maximum size: {settings.max_file_size / 1024 / 1024:.1f}MB"
         )
     
-    # Check file extension
+    validate_image_extension(file.filename)
+
+def validate_image_extension(filename: str) -> None:
+    """Reject file names without an allowed image extension."""
     allowed_extensions = settings.allowed_image_extensions.split(",")
-    file_extension = file.filename.split(".")[-1].lower()
+    file_extension = filename.split(".")[-1].lower() if "." in filename else ""
     if file_extension not in allowed_extensions:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid file format. Allowed formats: {', '.join(allowed_extensions)}"
         )
 
+def _jpeg_dimensions(data: bytes) -> Optional[tuple[int, int]]:
+    """Walk JPEG marker segments up to the first SOFn frame header."""
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:  # Fill byte
+            offset += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:  # Markers without a length
+            offset += 2
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + struct.unpack(">H", data[offset + 2:offset + 4])[0]
+    return None
+
+def _webp_dimensions(data: bytes) -> Optional[tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25:
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+    return None
+
+def sniff_image_header(data: bytes) -> tuple[Optional[str], Optional[tuple[int, int]]]:
+    """
+    Identify an image from its leading bytes without decoding it.
+    Returns (format, (width, height)); either is None if it can't be determined
+    from the bytes given.
+    """
+    if data.startswith(b"\xff\xd8\xff"):
+        return "JPEG", _jpeg_dimensions(data)
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        # IHDR is always the first chunk
+        return "PNG", struct.unpack(">II", data[16:24]) if len(data) >= 24 else None
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "WEBP", _webp_dimensions(data)
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF", struct.unpack("<HH", data[6:10]) if len(data) >= 10 else None
+    return None, None
+
+def validate_image_header(data: bytes, filename: str, complete: bool = False) -> bool:
+    """
+    Reject uploads whose content is not the image their extension claims, or
+    whose declared dimensions exceed max_image_pixels, before any decode.
+    Returns False if the dimensions are not within `data` yet; with
+    complete=True (the whole file) that is an error too.
+    """
+    image_format, dimensions = sniff_image_header(data)
+    file_extension = filename.split(".")[-1].lower()
+    expected_format = EXTENSION_FORMATS.get(file_extension)
+    if image_format is None or (expected_format and image_format != expected_format):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File content does not match an allowed image format"
+        )
+    
+    if dimensions is None:
+        if complete:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid image file"
+            )
+        return False
+    
+    width, height = dimensions
+    if width == 0 or height == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid image file"
+        )
+    if width * height > settings.max_image_pixels:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Image dimensions too large ({width}x{height}). "
+                   f"Maximum: {settings.max_image_pixels} pixels"
+        )
+    return True
+
+def parse_id_list(ids: str, max_items: int) -> List[int]:
+    """Parse a comma-separated id list; duplicates are dropped, the order is kept."""
+    try:
+        parsed = list(dict.fromkeys(int(item) for item in ids.split(",") if item.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if not parsed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one id is required"
+        )
+    if len(parsed) > max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many ids. Maximum per request: {max_items}"
+        )
+    return parsed
+
 def generate_unique_filename(original_filename: str) -> str:
     """Generate unique filename while preserving extension."""
     file_extension = original_filename.split(".")[-1].lower()
     unique_id = str(uuid.uuid4())
     return f"{unique_id}.{file_extension}"
 
-async def save_image(file: UploadFile, subfolder: str = "paintings", base_url: str = "http://localhost:8000") -> tuple[str, str]:
+def shard_path(filename: str) -> str:
     """
-    Save uploaded image and create thumbnail.
-    Returns tuple of (image_path, thumbnail_path) as absolute URLs.
+    Return the hashed fan-out location for a file, e.g. "ab/cd/<uuid>.jpg".
+    Thumbnails ("thumb_<name>") are placed in the same bucket as their original.
     """
-    # Validate the image
-    validate_image(file)
-    
-    # Create upload directory if it doesn't exist
-    upload_path = os.path.join(settings.upload_dir, subfolder)
-    thumbnail_path = os.path.join(settings.upload_dir, subfolder, "thumbnails")
-    
-    os.makedirs(upload_path, exist_ok=True)
-    os.makedirs(thumbnail_path, exist_ok=True)
+    key = filename[len("thumb_"):] if filename.startswith("thumb_") else filename
+    digest = hashlib.md5(posixpath.splitext(key)[0].encode("utf-8")).hexdigest()
+    return posixpath.join(digest[:2], digest[2:4], filename)
+
+def thumbnail_filename(filename: str) -> str:
+    """Return the thumbnail file name for an original under the current profile."""
+    stem = posixpath.splitext(filename)[0]
+    return f"thumb_{stem}.{THUMBNAIL_EXTENSIONS[settings.thumbnail_format.upper()]}"
+
+def derivative_profile() -> str:
+    """Describe the current thumbnail settings; a change means derivatives are stale."""
+    return f"{settings.thumbnail_size}:{settings.thumbnail_format.upper()}:{settings.thumbnail_quality}:upright-optimized"
+
+def create_thumbnail(image_file_path: str, thumbnail_file_path: str) -> None:
+    """Render the thumbnail of an original using the configured derivative profile."""
+    with Image.open(image_file_path) as img:
+        # Convert to RGB if necessary (for PNG with transparency)
+        if img.mode in ("RGBA", "P"):
+            img = img.convert("RGB")
+        
+        # Create thumbnail (maintaining aspect ratio)
+        size = settings.thumbnail_size
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        # EXIF is not copied to the thumbnail, so apply the orientation to the pixels
+        img = ImageOps.exif_transpose(img)
+        img.save(
+            thumbnail_file_path,
+            settings.thumbnail_format.upper(),
+            quality=settings.thumbnail_quality,
+            optimize=True,
+            progressive=True
+        )
+
+def compute_image_metadata(image_file_path: str, thumbnail_file_path: str) -> dict:
+    """
+    Compute layout and placeholder data for an upload: the original's displayed
+    pixel dimensions, its dominant color and a BlurHash. Only the image header of
+    the original is read; colors are sampled from the thumbnail.
+    """
+    with Image.open(image_file_path) as img:
+        width, height = img.size
+        # EXIF orientations 5-8 are rotated by 90 degrees when displayed
+        if img.getexif().get(0x0112) in (5, 6, 7, 8):
+            width, height = height, width
     
-    # Generate unique filename
-    filename = generate_unique_filename(file.filename)
-    image_file_path = os.path.join(upload_path, filename)
-    thumbnail_file_path = os.path.join(thumbnail_path, f"thumb_{filename}")
+    with Image.open(thumbnail_file_path) as thumb:
+        thumb = thumb.convert("RGB")
+        palette_image = thumb.resize((64, 64)).quantize(colors=5)
+        palette = palette_image.getpalette()
+        _, index = max(palette_image.getcolors())
+        dominant_color = "#{:02x}{:02x}{:02x}".format(*palette[index * 3:index * 3 + 3])
+        blurhash = encode_blurhash(thumb)
     
-    # Save original image
-    content = await file.read()
+    return {
+        "image_width": width,
+        "image_height": height,
+        "dominant_color": dominant_color,
+        "blurhash": blurhash,
+    }
+
+def media_url_to_path(url: Optional[str]) -> Optional[str]:
+    """Convert a stored /uploads/... URL (absolute or relative) to a local file path."""
+    if not url or "/uploads/" not in url:
+        return None
+    relative_path = url.split("/uploads/", 1)[1].split("?", 1)[0]
+    return os.path.join(settings.upload_dir, *relative_path.split("/"))
+
+def _store_image(content: bytes, image_file_path: str, thumbnail_file_path: str) -> dict:
+    """Write an original, render its thumbnail and return its image metadata."""
     with open(image_file_path, "wb") as f:
         f.write(content)
     
-    # Create and save thumbnail
     try:
-        with Image.open(image_file_path) as img:
-            # Convert to RGB if necessary (for PNG with transparency)
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-            
-            # Create thumbnail (300x300 max, maintaining aspect ratio)
-            img.thumbnail((300, 300), Image.Resampling.LANCZOS)
-            img.save(thumbnail_file_path, "JPEG", quality=85)
+        create_thumbnail(image_file_path, thumbnail_file_path)
+        return compute_image_metadata(image_file_path, thumbnail_file_path)
     except Exception as e:
         # Clean up original file if thumbnail creation fails
         if os.path.exists(image_file_path):
             os.remove(image_file_path)
+        if os.path.exists(thumbnail_file_path):
+            os.remove(thumbnail_file_path)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid image file"
         )
+
+async def save_image(file: UploadFile, subfolder: str = "paintings", base_url: str = "http://localhost:8000") -> tuple[str, str, dict]:
+    """
+    Save uploaded image and create thumbnail.
+    Returns tuple of (image_path, thumbnail_path) as absolute URLs, plus the
+    image metadata (dimensions, dominant color, BlurHash placeholder).
+    """
+    # Validate the image
+    validate_image(file)
+    
+    # Check magic bytes and declared dimensions from the header before the
+    # rest of the file is read or anything is decoded
+    content = await file.read(IMAGE_HEADER_BYTES)
+    header_checked = validate_image_header(content, file.filename)
+    content += await file.read()
+    if not header_checked:
+        validate_image_header(content, file.filename, complete=True)
+    
+    # Create upload directory if it doesn't exist
+    upload_path = os.path.join(settings.upload_dir, subfolder)
+    thumbnail_path = os.path.join(settings.upload_dir, subfolder, "thumbnails")
+    
+    os.makedirs(upload_path, exist_ok=True)
+    os.makedirs(thumbnail_path, exist_ok=True)
+    
+    # Generate unique filename, fanned out into hashed sub-directories
+    filename = generate_unique_filename(file.filename)
+    relative_name = shard_path(filename) if settings.upload_sharding else filename
+    relative_dir = posixpath.dirname(relative_name)
+    relative_thumbnail = posixpath.join(relative_dir, thumbnail_filename(filename))
+    image_file_path = os.path.join(upload_path, *relative_name.split("/"))
+    thumbnail_file_path = os.path.join(thumbnail_path, *relative_thumbnail.split("/"))
+    
+    os.makedirs(os.path.dirname(image_file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(thumbnail_file_path), exist_ok=True)
+    
+    # Save original image and create thumbnail off the event loop, so
+    # concurrent uploads are processed in parallel
+    image_metadata = await run_in_threadpool(
+        _store_image, content, image_file_path, thumbnail_file_path
+    )
     
     # Return absolute URLs for frontend consumption
-    image_url = f"{base_url}/uploads/{subfolder}/{filename}"
-    thumbnail_url = f"{base_url}/uploads/{subfolder}/thumbnails/thumb_{filename}"
+    image_url = f"{base_url}/uploads/{subfolder}/{relative_name}"
+    thumbnail_url = f"{base_url}/uploads/{subfolder}/thumbnails/{relative_thumbnail}"
     
-    return image_url, thumbnail_url
+    return image_url, thumbnail_url, image_metadata
 
 def delete_image_files(image_url: Optional[str], thumbnail_url: Optional[str]) -> None:
     """Delete image files from disk."""
-    if image_url:
-        image_path = os.path.join(".", image_url.lstrip("/"))
-        if os.path.exists(image_path):
-            os.remove(image_path)
-    
-    if thumbnail_url:
-        thumbnail_path = os.path.join(".", thumbnail_url.lstrip("/"))
-        if os.path.exists(thumbnail_path):
-            os.remove(thumbnail_path)
+    for url in (image_url, thumbnail_url):
+        file_path = media_url_to_path(url)
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
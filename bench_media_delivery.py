@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the media delivery modes.
+
+Serves one large synthetic original through each mode and reports MB/s and
+requests/s as seen by an in-process ASGI client:
+- static:           StaticFiles (the default mount)
+- sendfile:         SendfileResponse (zero-copy when the server supports it)
+- sendfile-range:   SendfileResponse answering 1MB range requests
+- x-accel-redirect: app only authorizes and emits headers, nginx sends the bytes
+
+Usage: python bench_media_delivery.py [size_mb] [requests]
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.routers import media
+
+def build_app(mode: str, upload_dir: str) -> FastAPI:
+    app = FastAPI()
+    if mode == "static":
+        app.mount("/uploads", StaticFiles(directory=upload_dir), name="uploads")
+    else:
+        app.include_router(media.router)
+    return app
+
+def run(mode: str, upload_dir: str, requests: int, range_request: bool = False) -> None:
+    settings.upload_dir = upload_dir
+    settings.media_delivery_mode = "sendfile" if mode == "sendfile-range" else mode
+    client = TestClient(build_app(settings.media_delivery_mode, upload_dir))
+
+    headers = {"Range": "bytes=0-1048575"} if range_request else {}
+    transferred = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get("/uploads/paintings/bench.bin", headers=headers)
+        assert response.status_code in (200, 206), response.status_code
+        transferred += len(response.content)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{mode:<18} {requests / elapsed:>10.1f} req/s "
+        f"{transferred / elapsed / 1024 / 1024:>10.1f} MB/s app-side "
+        f"{elapsed / requests * 1000:>8.2f} ms/req"
+    )
+
+if __name__ == "__main__":
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as upload_dir:
+        os.makedirs(os.path.join(upload_dir, "paintings"))
+        size = size_mb * 1024 * 1024
+        with open(os.path.join(upload_dir, "paintings", "bench.bin"), "wb") as f:
+            f.write(os.urandom(size))
+
+        print(f"📦 {size_mb}MB original, {requests} requests per mode")
+        print("=" * 70)
+        run("static", upload_dir, requests)
+        run("sendfile", upload_dir, requests)
+        run("sendfile-range", upload_dir, requests, range_request=True)
+        run("x-accel-redirect", upload_dir, requests)
@@ -10,6 +10,7 @@ This script will:
 
 import sys
 import os
+import shutil
 from pathlib import Path
 
 # Add the app directory to the Python path
@@ -19,6 +20,7 @@ from sqlalchemy.orm import Session
 from app.database import get_db, engine
 from app.models import User, Painting, Rating, Comment, Category
 from app.utils import delete_image_files
+from app.tiles import tile_directory
 
 def cleanup_database():
     """Clean up the database keeping only demo accounts"""
@@ -49,22 +51,8 @@ def cleanup_database():
         # Delete image files for each painting
         for painting in paintings:
             try:
-                if painting.image_url:
-                    # Extract filename from URL and delete file
-                    filename = painting.image_url.split('/')[-1]
-                    image_path = Path("static/images/paintings") / filename
-                    if image_path.exists():
-                        image_path.unlink()
-                        print(f"   🗑️  Deleted image: {filename}")
-                
-                if painting.thumbnail_url:
-                    # Delete thumbnail if it exists
-                    thumbnail_filename = painting.thumbnail_url.split('/')[-1]
-                    thumbnail_path = Path("static/images/paintings") / thumbnail_filename
-                    if thumbnail_path.exists():
-                        thumbnail_path.unlink()
-                        print(f"   🗑️  Deleted thumbnail: {thumbnail_filename}")
-                        
+                delete_image_files(painting.image_url, painting.thumbnail_url)
+                shutil.rmtree(tile_directory(painting.image_url), ignore_errors=True)
             except Exception as e:
                 print(f"   ⚠️  Error deleting images for painting {painting.id}: {e}")
         
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Garbage collector for orphaned media files.
+This script will:
+1. Stream every referenced image and thumbnail URL from the database
+2. Walk the upload tree (originals, thumbnails, deep zoom tiles)
+3. Delete or quarantine unreferenced files older than a grace period, in batches
+4. Remove expired or abandoned resumable uploads from the staging directory
+5. Report the reclaimed bytes
+
+Usage: python collect_orphaned_media.py [--grace-hours N] [--delete | --quarantine DIR]
+Without --delete or --quarantine the script only reports what it would remove.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Painting
+from app.tiles import tile_directory
+from app.utils import media_url_to_path
+
+BATCH_SIZE = 500
+
+def referenced_media() -> tuple[set, set]:
+    """Return the normalized paths of referenced files and tile pyramids."""
+    files = set()
+    tile_dirs = set()
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            Painting.image_url, Painting.thumbnail_url
+        ).execution_options(stream_results=True, yield_per=1000)
+        for row in rows:
+            for url in (row.image_url, row.thumbnail_url):
+                path = media_url_to_path(url)
+                if path:
+                    files.add(os.path.normpath(path))
+            if row.image_url:
+                tile_dirs.add(os.path.normpath(tile_directory(row.image_url)))
+    finally:
+        db.close()
+    return files, tile_dirs
+
+def tree_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+def find_orphans(files: set, tile_dirs: set, cutoff: float, skip_dir: str):
+    """Yield (path, size) for unreferenced files and tile pyramids older than cutoff."""
+    upload_dir = os.path.normpath(settings.upload_dir)
+    tiles_root = os.path.join(upload_dir, "tiles")
+    # Sprite sheets are derived caches that replace their own stale versions
+    sprites_root = os.path.join(upload_dir, "sprites")
+
+    for root, dirs, names in os.walk(upload_dir):
+        root = os.path.normpath(root)
+        if root in (skip_dir, sprites_root):
+            dirs[:] = []
+            continue
+
+        # Pyramids are removed as a whole, at uploads/tiles/ab/cd/<stem>
+        if os.path.dirname(os.path.dirname(os.path.dirname(root))) == tiles_root:
+            dirs[:] = []
+            pyramid = root[:-len(".partial")] if root.endswith(".partial") else root
+            if (pyramid not in tile_dirs or root != pyramid) and os.path.getmtime(root) < cutoff:
+                yield root, tree_size(root)
+            continue
+
+        for name in names:
+            path = os.path.join(root, name)
+            if name.startswith(".") or path in files:
+                continue
+            stat_result = os.stat(path)
+            if stat_result.st_mtime < cutoff:
+                yield path, stat_result.st_size
+
+def find_stale_staging(cutoff: float):
+    """Yield (path, size) for expired or abandoned resumable uploads."""
+    staging_dir = settings.resumable_upload_dir
+    if not os.path.isdir(staging_dir):
+        return
+    expiry = time.time() - settings.resumable_upload_expiry_hours * 3600
+
+    for name in os.listdir(staging_dir):
+        stem, extension = os.path.splitext(name)
+        if extension != ".part":
+            continue
+        part_path = os.path.join(staging_dir, name)
+        info_path = os.path.join(staging_dir, f"{stem}.json")
+        try:
+            with open(info_path) as f:
+                stale = json.load(f)["created_at"] < expiry
+        except (ValueError, KeyError, OSError):
+            # Data without a readable info file can never be completed
+            stale = os.path.getmtime(part_path) < cutoff
+        if stale:
+            yield part_path, os.path.getsize(part_path)
+            if os.path.exists(info_path):
+                yield info_path, os.path.getsize(info_path)
+
+def quarantine_target(path: str, root: str, quarantine_dir: str) -> str:
+    """
+    Where a file under `root` (the upload or staging directory) is moved:
+    quarantine_dir/<root name>/<path relative to root>, never outside quarantine_dir.
+    """
+    root_name = os.path.basename(os.path.normpath(os.path.abspath(root)))
+    target = os.path.abspath(os.path.join(quarantine_dir, root_name, os.path.relpath(path, root)))
+    quarantine = os.path.abspath(quarantine_dir)
+    if os.path.commonpath([target, quarantine]) != quarantine or target == quarantine:
+        raise ValueError(f"quarantine target {target} is outside {quarantine}")
+    return target
+
+def remove(path: str, root: str, quarantine_dir: str) -> None:
+    if quarantine_dir:
+        target = quarantine_target(path, root, quarantine_dir)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+    elif os.path.isdir(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+def collect_orphaned_media(grace_hours: float, delete: bool, quarantine_dir: str) -> None:
+    apply = delete or bool(quarantine_dir)
+    cutoff = time.time() - grace_hours * 3600
+    skip_dir = os.path.normpath(quarantine_dir) if quarantine_dir else None
+
+    print("🔎 Loading referenced media from the database...")
+    files, tile_dirs = referenced_media()
+    print(f"   ✅ {len(files)} referenced files, {len(tile_dirs)} possible tile pyramids")
+
+    candidates = find_orphans(files, tile_dirs, cutoff, skip_dir)
+    staging = find_stale_staging(cutoff)
+
+    reclaimed = 0
+    removed = 0
+    batch = []
+
+    def flush() -> None:
+        nonlocal reclaimed, removed
+        for path, size, root in batch:
+            try:
+                if apply:
+                    remove(path, root, quarantine_dir)
+                reclaimed += size
+                removed += 1
+            except (OSError, ValueError) as e:
+                print(f"   ⚠️  {path}: {e}")
+        batch.clear()
+        print(f"   🗑️  {removed} orphans, {reclaimed / 1024 / 1024:.1f}MB so far")
+
+    for root, source in ((settings.upload_dir, candidates), (settings.resumable_upload_dir, staging)):
+        for path, size in source:
+            if not apply:
+                print(f"   • {path} ({size} bytes)")
+            batch.append((path, size, root))
+            if len(batch) >= BATCH_SIZE:
+                flush()
+    if batch:
+        flush()
+
+    action = "Deleted" if delete else f"Quarantined in {quarantine_dir}" if quarantine_dir else "Would remove"
+    print(f"\n🎉 {action}: {removed} orphaned files/pyramids, {reclaimed / 1024 / 1024:.1f}MB reclaimed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove media files no painting references")
+    parser.add_argument("--grace-hours", type=float, default=24,
+                        help="Keep unreferenced files newer than this (in-flight uploads)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--delete", action="store_true", help="Delete orphans")
+    mode.add_argument("--quarantine", metavar="DIR", help="Move orphans into DIR instead of deleting")
+    args = parser.parse_args()
+
+    try:
+        collect_orphaned_media(args.grace_hours, args.delete, args.quarantine)
+    except Exception as e:
+        print(f"❌ Garbage collection failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Migration script for painting image metadata columns.
+This script will:
+1. Add any missing image metadata columns to the paintings table
+2. Backfill dimensions, dominant color and BlurHash for existing paintings
+"""
+
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy import inspect, text, update
+from app.database import SessionLocal, engine
+from app.models import Painting
+from app.utils import compute_image_metadata, media_url_to_path
+
+# Column name -> DDL type, in the order they are added
+IMAGE_METADATA_COLUMNS = {
+    "image_width": "INTEGER NULL",
+    "image_height": "INTEGER NULL",
+    "dominant_color": "VARCHAR(7) NULL",
+    "blurhash": "VARCHAR(64) NULL",
+    "tiles_ready": "BOOLEAN NOT NULL DEFAULT 0",
+    "original_bytes_saved": "INTEGER NULL",
+    "thumbnail_bytes_saved": "INTEGER NULL",
+}
+
+BATCH_SIZE = 200
+
+def add_missing_columns() -> None:
+    existing = {column["name"] for column in inspect(engine).get_columns("paintings")}
+    with engine.connect() as connection:
+        for name, ddl in IMAGE_METADATA_COLUMNS.items():
+            if name in existing:
+                continue
+            connection.execute(text(f"ALTER TABLE paintings ADD COLUMN {name} {ddl}"))
+            print(f"✅ Added column paintings.{name}")
+        connection.commit()
+
+def backfill_image_metadata() -> None:
+    db = SessionLocal()
+    last_id = 0
+    updated = 0
+    skipped = 0
+
+    try:
+        while True:
+            rows = db.query(
+                Painting.id, Painting.image_url, Painting.thumbnail_url
+            ).filter(
+                Painting.id > last_id, Painting.blurhash.is_(None)
+            ).order_by(Painting.id).limit(BATCH_SIZE).all()
+            if not rows:
+                break
+
+            values = []
+            for row in rows:
+                image_path = media_url_to_path(row.image_url)
+                thumbnail_path = media_url_to_path(row.thumbnail_url) or image_path
+                try:
+                    values.append({"id": row.id, **compute_image_metadata(image_path, thumbnail_path)})
+                except Exception as e:
+                    skipped += 1
+                    print(f"   ⚠️  Painting {row.id}: {e}")
+
+            if values:
+                db.execute(update(Painting), values)
+            db.commit()
+
+            last_id = rows[-1].id
+            updated += len(values)
+            print(f"   ✅ Backfilled {updated} paintings (up to id {last_id})")
+    finally:
+        db.close()
+
+    print(f"\n🎉 Backfill completed: {updated} updated, {skipped} skipped")
+
+if __name__ == "__main__":
+    print("Starting image metadata migration...")
+    try:
+        add_missing_columns()
+        backfill_image_metadata()
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
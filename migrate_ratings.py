@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Migration script for the ratings tables.
+This script will:
+1. Add the per-star count (stars_1 .. stars_5) and bayesian_score columns to the paintings table
+2. Create the rating_prior table and the indexes (ratings keyset pages, best_rated sort)
+3. Backfill star counts, rating count, average rating and bayesian score from the ratings table
+
+Run refresh_rating_scores.py afterwards to compute the global prior from the backfilled counts.
+"""
+
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy import inspect, text, update, func, bindparam
+from app.database import SessionLocal, engine
+from app.models import Painting, Rating, RatingPrior
+from app.crud import RatingService
+
+# Column name -> DDL type, in the order they are added
+RATING_COLUMNS = {
+    **{f"stars_{stars}": "INTEGER NOT NULL DEFAULT 0" for stars in range(1, 6)},
+    "bayesian_score": "FLOAT NOT NULL DEFAULT 0",
+}
+
+BATCH_SIZE = 500
+
+_paintings = Painting.__table__
+STAR_COUNTS_UPDATE = update(_paintings).where(_paintings.c.id == bindparam("painting_id")).values(
+    **{f"stars_{stars}": bindparam(f"count_{stars}") for stars in range(1, 6)},
+    updated_at=_paintings.c.updated_at
+)
+
+def add_missing_indexes() -> None:
+    for table in (Rating.__table__, Painting.__table__):
+        existing = {index["name"] for index in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            index.create(bind=engine)
+            print(f"✅ Created index {index.name}")
+
+def add_missing_tables() -> None:
+    if not inspect(engine).has_table(RatingPrior.__tablename__):
+        RatingPrior.__table__.create(bind=engine)
+        print(f"✅ Created table {RatingPrior.__tablename__}")
+
+def add_missing_columns() -> None:
+    existing = {column["name"] for column in inspect(engine).get_columns("paintings")}
+    with engine.connect() as connection:
+        for name, ddl in RATING_COLUMNS.items():
+            if name in existing:
+                continue
+            connection.execute(text(f"ALTER TABLE paintings ADD COLUMN {name} {ddl}"))
+            print(f"✅ Added column paintings.{name}")
+        connection.commit()
+
+def backfill_star_counts() -> None:
+    db = SessionLocal()
+    last_id = 0
+    updated = 0
+
+    try:
+        mean, weight = RatingService.get_rating_prior(db)
+        while True:
+            painting_ids = [row.id for row in db.query(Painting.id).filter(
+                Painting.id > last_id
+            ).order_by(Painting.id).limit(BATCH_SIZE).all()]
+            if not painting_ids:
+                break
+
+            counts = {painting_id: {stars: 0 for stars in range(1, 6)} for painting_id in painting_ids}
+            for painting_id, stars, count in db.query(
+                Rating.painting_id, Rating.rating, func.count(Rating.id)
+            ).filter(Rating.painting_id.in_(painting_ids)).group_by(Rating.painting_id, Rating.rating):
+                counts[painting_id][stars] = count
+
+            # Both statements keep updated_at: backfilled counts are not edits
+            db.execute(STAR_COUNTS_UPDATE, [
+                {"painting_id": painting_id, **{f"count_{stars}": count for stars, count in histogram.items()}}
+                for painting_id, histogram in counts.items()
+            ])
+            # Count, average and score follow from the star columns
+            db.query(Painting).filter(Painting.id.in_(painting_ids)).update(
+                {**RatingService.rating_stats_values(mean, weight), Painting.updated_at: Painting.updated_at},
+                synchronize_session=False
+            )
+            db.commit()
+
+            last_id = painting_ids[-1]
+            updated += len(painting_ids)
+            print(f"   ✅ Backfilled {updated} paintings (up to id {last_id})")
+    finally:
+        db.close()
+
+    print(f"\n🎉 Backfill completed: {updated} paintings")
+
+if __name__ == "__main__":
+    print("Starting ratings migration...")
+    try:
+        add_missing_columns()
+        add_missing_tables()
+        add_missing_indexes()
+        backfill_star_counts()
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Migration script to move existing uploads into the sharded directory layout.
+This script will:
+1. Walk paintings in id order, one batch at a time
+2. Move flat originals and thumbnails into ab/cd/ sub-directories (in parallel)
+3. Rewrite image_url/thumbnail_url for the batch in one bulk UPDATE
+4. Record the last migrated painting id so an interrupted run can resume
+
+Usage: python migrate_upload_layout.py [--batch-size N] [--workers N] [--restart]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy import update
+from app.database import SessionLocal
+from app.models import Painting
+from app.utils import shard_path, media_url_to_path
+
+CHECKPOINT_FILE = Path(__file__).parent / ".upload_layout_checkpoint.json"
+
+def load_checkpoint() -> int:
+    if CHECKPOINT_FILE.exists():
+        return json.loads(CHECKPOINT_FILE.read_text()).get("last_painting_id", 0)
+    return 0
+
+def save_checkpoint(last_painting_id: int) -> None:
+    CHECKPOINT_FILE.write_text(json.dumps({"last_painting_id": last_painting_id}))
+
+def sharded_url(url: Optional[str]) -> Optional[str]:
+    """Return the sharded URL for a flat upload URL, or None if already sharded."""
+    if not url or "/uploads/" not in url:
+        return None
+    prefix, relative_path = url.split("/uploads/", 1)
+    directory, filename = posixpath.split(relative_path)
+    if directory not in ("paintings", "paintings/thumbnails"):
+        return None
+    return f"{prefix}/uploads/{directory}/{shard_path(filename)}"
+
+def move_file(url: Optional[str]) -> Tuple[Optional[str], int]:
+    """Move one file into its shard. Returns (new_url, moved_count)."""
+    new_url = sharded_url(url)
+    if not new_url:
+        return None, 0
+
+    source = media_url_to_path(url)
+    destination = media_url_to_path(new_url)
+    if os.path.exists(source):
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(source, destination)
+        return new_url, 1
+    if os.path.exists(destination):
+        # Moved by an earlier, interrupted run
+        return new_url, 0
+
+    print(f"   ⚠️  Missing file, URL left unchanged: {url}")
+    return None, 0
+
+def migrate_painting(row) -> Tuple[Optional[dict], int]:
+    image_url, image_moved = move_file(row.image_url)
+    thumbnail_url, thumbnail_moved = move_file(row.thumbnail_url)
+
+    values = {}
+    if image_url:
+        values["image_url"] = image_url
+    if thumbnail_url:
+        values["thumbnail_url"] = thumbnail_url
+    if not values:
+        return None, 0
+    return {"id": row.id, **values}, image_moved + thumbnail_moved
+
+def migrate_upload_layout(batch_size: int, workers: int) -> None:
+    db = SessionLocal()
+    last_id = load_checkpoint()
+    if last_id:
+        print(f"↩️  Resuming after painting {last_id}")
+
+    migrated = 0
+    moved = 0
+    started = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                rows = db.query(
+                    Painting.id, Painting.image_url, Painting.thumbnail_url
+                ).filter(Painting.id > last_id).order_by(Painting.id).limit(batch_size).all()
+                if not rows:
+                    break
+
+                results = list(executor.map(migrate_painting, rows))
+                updates = [values for values, _ in results if values]
+                if updates:
+                    # Bulk UPDATE by primary key, one round trip per batch
+                    db.execute(update(Painting), updates)
+                db.commit()
+
+                last_id = rows[-1].id
+                save_checkpoint(last_id)
+                migrated += len(updates)
+                moved += sum(count for _, count in results)
+                print(f"   ✅ Up to painting {last_id}: {migrated} rows rewritten, {moved} files moved")
+
+        elapsed = time.perf_counter() - started
+        print(f"\n🎉 Migration completed in {elapsed:.1f}s ({moved / max(elapsed, 1e-6):.0f} files/s)")
+        CHECKPOINT_FILE.unlink(missing_ok=True)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Migration failed after painting {last_id}: {e}")
+        print("   Re-run the script to resume from the last checkpoint.")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move uploads into the sharded ab/cd/ layout")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    if args.restart:
+        CHECKPOINT_FILE.unlink(missing_ok=True)
+
+    print("🗂️  Starting upload layout migration...")
+    try:
+        migrate_upload_layout(args.batch_size, args.workers)
+    except Exception:
+        sys.exit(1)
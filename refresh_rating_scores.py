@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Periodic refresh of the weighted (Bayesian) rating scores.
+This script will:
+1. Compute the global mean rating from the paintings' per-star counts
+2. Stop if it moved less than --min-drift from the stored prior (unless --force)
+3. Store the new prior, which rating writes use from then on
+4. Recompute bayesian_score for every painting against it, in batches
+
+Rating writes keep each painting's score current between runs; only a drifting
+global mean needs this batch pass, e.g. nightly from cron.
+
+Cache invalidation only reaches the API processes through Redis (REDIS_URL).
+With the in-process cache, their cached listings and paintings keep the old
+scores until RESPONSE_CACHE_TTL / ENTITY_CACHE_TTL_PAINTING expire.
+
+Usage: python refresh_rating_scores.py [--min-drift 0.01] [--weight N] [--force]
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy import func
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Painting, RatingPrior
+from app.crud import RatingService
+from app.cache import RedisCache, response_cache, bump_catalog_version, invalidate_entity
+
+BATCH_SIZE = 1000
+
+def global_mean(db) -> float:
+    stars = [func.sum(getattr(Painting, f"stars_{value}")) for value in range(1, 6)]
+    counts = [count or 0 for count in db.query(*stars).one()]
+    total_count = sum(counts)
+    if not total_count:
+        return settings.bayesian_prior_mean
+    return sum(value * count for value, count in zip(range(1, 6), counts)) / total_count
+
+def refresh_scores(min_drift: float, weight: int, force: bool) -> None:
+    db = SessionLocal()
+    try:
+        mean = round(global_mean(db), 4)
+        current_mean, current_weight = RatingService.get_rating_prior(db)
+        drift = abs(mean - current_mean)
+        print(f"📊 Global mean {mean:.4f} (stored prior {current_mean:.4f}, drift {drift:.4f}), weight {weight}")
+        if not force and drift < min_drift and weight == current_weight and db.get(RatingPrior, 1):
+            print("✅ Prior has not drifted; scores are current")
+            return
+
+        prior = db.get(RatingPrior, 1) or RatingPrior(id=1)
+        prior.mean = mean
+        prior.weight = weight
+        db.add(prior)
+        db.commit()
+
+        last_id = 0
+        updated = 0
+        while True:
+            # Id ranges of BATCH_SIZE paintings keep each UPDATE short
+            batch_ids = [row.id for row in db.query(Painting.id).filter(
+                Painting.id > last_id
+            ).order_by(Painting.id).limit(BATCH_SIZE).all()]
+            if not batch_ids:
+                break
+            # Keep updated_at: a rescore is not an edit, and it is the detail view's validator
+            db.query(Painting).filter(
+                Painting.id >= batch_ids[0], Painting.id <= batch_ids[-1]
+            ).update(
+                {**RatingService.rating_stats_values(mean, weight), Painting.updated_at: Painting.updated_at},
+                synchronize_session=False
+            )
+            db.commit()
+            for painting_id in batch_ids:
+                invalidate_entity(Painting, painting_id)
+
+            last_id = batch_ids[-1]
+            updated += len(batch_ids)
+            print(f"   ✅ Refreshed {updated} paintings (up to id {last_id})")
+    finally:
+        db.close()
+
+    # Cached listings sorted by score are now stale
+    bump_catalog_version()
+    if not isinstance(response_cache, RedisCache):
+        print(f"⚠️  REDIS_URL is not set: API processes serve cached listings for up to "
+              f"{settings.response_cache_ttl}s and cached paintings for up to "
+              f"{settings.entity_cache_ttl_painting}s with the old scores")
+    print(f"\n🎉 Refresh completed: {updated} paintings scored against mean {mean:.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute weighted rating scores against the global mean")
+    parser.add_argument("--min-drift", type=float, default=0.01,
+                        help="Skip the refresh if the global mean moved less than this")
+    parser.add_argument("--weight", type=int, default=settings.bayesian_prior_weight,
+                        help="Ratings' worth of the global mean blended into each score")
+    parser.add_argument("--force", action="store_true", help="Refresh even if the prior has not drifted")
+    args = parser.parse_args()
+    if args.weight < 1:
+        parser.error("--weight must be at least 1")
+
+    try:
+        refresh_scores(args.min_drift, args.weight, args.force)
+    except Exception as e:
+        print(f"❌ Refresh failed: {e}")
+        sys.exit(1)